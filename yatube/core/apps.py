@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import db
+
+        connection_created.connect(db.tune_sqlite)
+        request_started.connect(db.check_connections)
+        request_finished.connect(db.mark_idle)
@@ -0,0 +1,199 @@
+"""ASGI-вход для Django 2.2, в котором нет ни django.core.asgi, ни async views.
+
+Запросы принимает цикл событий, а view выполняются в пуле потоков
+ASGI_THREADS: медленная база держит поток пула, но не цикл и не
+остальные соединения. Весь ответ, включая потоковый, собирается в
+одном потоке — соединения с базой в Django привязаны к потоку.
+Поток не обгоняет клиента больше чем на ASGI_SEND_QUEUE кусков и
+бросает ответ, когда клиент отключился.
+WSGI-развёртывание (yatube.wsgi) этот модуль не затрагивает.
+"""
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from .template_backend import warm_up_templates
+
+
+def build_environ(scope, body):
+    """WSGI environ из HTTP scope ASGI."""
+
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+async def read_body(receive):
+    body = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(body)
+
+
+async def watch_disconnect(receive, disconnected):
+    """Ждёт http.disconnect, пока ответ ещё передаётся."""
+
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    disconnected.set()
+
+
+async def forward(messages, send, disconnected):
+    """Отправляет сообщения из очереди до None.
+
+    После отключения очередь только вычерпывается: поток view должен
+    дойти до close().
+    """
+
+    while True:
+        message = await messages.get()
+        if message is None:
+            return
+        if disconnected.is_set():
+            continue
+        try:
+            await send(message)
+        except OSError:
+            disconnected.set()
+
+
+class ASGIHandler:
+    """ASGI 3 приложение поверх WSGI-обработчика Django."""
+
+    def __init__(self, application, threads, queue_size=8):
+        self.application = application
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип scope: {scope["type"]}')
+        body = await read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(self.queue_size)
+        disconnected = threading.Event()
+
+        def put(message):
+            # Поток view ждёт, пока в очереди освободится место; после
+            # отключения клиента передаётся только конец ответа (None).
+            if message is not None and disconnected.is_set():
+                return
+            asyncio.run_coroutine_threadsafe(
+                messages.put(message), loop
+            ).result()
+
+        watcher = asyncio.ensure_future(
+            watch_disconnect(receive, disconnected)
+        )
+        environ = build_environ(scope, body)
+        done = loop.run_in_executor(
+            self.executor, self.respond, environ, put, disconnected
+        )
+        try:
+            await forward(messages, send, disconnected)
+            await done
+        finally:
+            watcher.cancel()
+            # Если нас отменили, поток view не должен остаться ждать
+            # места в очереди.
+            disconnected.set()
+            while not messages.empty():
+                messages.get_nowait()
+
+    def respond(self, environ, put, disconnected):
+        """Выполняет запрос в потоке пула и передаёт ответ кусками."""
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        try:
+            result = self.application(environ, start_response)
+            try:
+                put({
+                    'type': 'http.response.start',
+                    'status': started['status'],
+                    'headers': started['headers'],
+                })
+                for chunk in result:
+                    if disconnected.is_set():
+                        return
+                    if chunk:
+                        put({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                put({'type': 'http.response.body', 'body': b''})
+            finally:
+                # close() шлёт request_finished и закрывает соединения
+                # с базой — в том же потоке, где они открывались.
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            put(None)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def get_asgi_application():
+    application = get_wsgi_application()
+    warm_up_templates()
+    return ASGIHandler(
+        application, settings.ASGI_THREADS, settings.ASGI_SEND_QUEUE
+    )
@@ -0,0 +1,330 @@
+"""Кеш в два уровня с защитой от лавины промахов.
+
+L1 — LRU в памяти процесса: не больше L1_MAX_ENTRIES записей и не
+дольше L1_TIMEOUT секунд. За ним общий для всех процессов L2 — любой
+кеш из CACHES, заданный в OPTIONS['L2']. Записи и удаления этого
+процесса видны сразу, записи других процессов — не позже чем через
+L1_TIMEOUT. Поэтому ключи, по которым сбрасывается кеш (версии лент и
+постов), сюда не кладутся: их читают прямо из L2.
+
+get_or_set считает значение один раз на ключ: другие потоки процесса
+ждут результата первого, другие процессы — пока значение не появится в
+L2 (блокировка через add). Значения из get_or_set пересчитываются чуть
+раньше срока с вероятностью, которая растёт к его концу (XFetch), и
+горячий ключ не истекает у всех разом.
+"""
+import math
+import pickle
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Значение из get_or_set: сколько секунд оно считалось и когда истекает.
+Computed = namedtuple('Computed', 'value delta expires')
+
+MISSING = object()
+
+# Состояние уровней по LOCATION: экземпляр бэкенда свой у каждого
+# потока, а L1, статистика и блокировки общие для процесса.
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def unwrap(value):
+    return value.value if isinstance(value, Computed) else value
+
+
+class LRUStore:
+    """L1: записи в порядке последнего обращения."""
+
+    def __init__(self, max_entries, count):
+        self.max_entries = max_entries
+        self.count = count
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self.count('l1_misses')
+            return MISSING
+        self.count('l1_hits')
+        # Копия на каждое чтение, как в LocMemCache: вызывающий может
+        # менять полученный объект.
+        return pickle.loads(entry[0])
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            self.delete(key)
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (data, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.count('l1_evictions', evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Tier:
+    """Общие для процесса L1, счётчики и ключи, которые сейчас считаются."""
+
+    def __init__(self, max_entries):
+        self._stats = Counter()
+        self.l1 = LRUStore(max_entries, self.count)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    @contextmanager
+    def flight(self, key):
+        """Один вычислитель на ключ; вернёт True, если пришлось ждать."""
+
+        with self._lock:
+            lock, users = self._flights.get(key, (threading.Lock(), 0))
+            self._flights[key] = (lock, users + 1)
+        waited = not lock.acquire(blocking=False)
+        if waited:
+            lock.acquire()
+        try:
+            yield waited
+        finally:
+            lock.release()
+            with self._lock:
+                lock, users = self._flights[key]
+                if users == 1:
+                    del self._flights[key]
+                else:
+                    self._flights[key] = (lock, users - 1)
+
+
+class TieredCache(BaseCache):
+    """L1 в памяти процесса перед общим L2.
+
+    OPTIONS: L2 — псевдоним кеша второго уровня, L1_MAX_ENTRIES,
+    L1_TIMEOUT, XFETCH_BETA, LOCK_TIMEOUT — сколько секунд другие
+    процессы ждут значение, которое считает один из них.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options['L2']
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.beta = options.get('XFETCH_BETA', 1.0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.poll_interval = options.get('POLL_INTERVAL', 0.05)
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = Tier(options.get('L1_MAX_ENTRIES', 1000))
+            self.tier = _tiers[location]
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _seconds(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_ttl(self, timeout, value=None):
+        ttl = self.l1_timeout
+        seconds = self._seconds(timeout)
+        if seconds is not None:
+            ttl = min(ttl, seconds)
+        if isinstance(value, Computed) and value.expires is not None:
+            ttl = min(ttl, value.expires - time.time())
+        return ttl
+
+    def _get(self, key, version):
+        """Сырое значение из L1 или L2, MISSING при промахе."""
+
+        full_key = self.make_key(key, version)
+        self.validate_key(full_key)
+        value = self.tier.l1.get(full_key)
+        if value is not MISSING:
+            return value
+        value = self.l2.get(key, MISSING, version=version)
+        if value is MISSING:
+            self.tier.count('l2_misses')
+            return MISSING
+        self.tier.count('l2_hits')
+        self.tier.l1.set(full_key, value, self._l1_ttl(None, value))
+        return value
+
+    def _expiring(self, value):
+        """XFetch: пора ли пересчитать значение до истечения срока."""
+
+        if not isinstance(value, Computed) or value.expires is None:
+            return False
+        jitter = -value.delta * self.beta * math.log(1 - random.random())
+        return time.time() + jitter >= value.expires
+
+    def get(self, key, default=None, version=None):
+        value = self._get(key, version)
+        return default if value is MISSING else unwrap(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version)
+        self.validate_key(full_key)
+        self.l2.set(key, value, self._seconds(timeout), version=version)
+        self.tier.l1.set(full_key, value, self._l1_ttl(timeout, value))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version)
+        self.validate_key(full_key)
+        added = self.l2.add(
+            key, value, self._seconds(timeout), version=version
+        )
+        if added:
+            self.tier.l1.set(full_key, value, self._l1_ttl(timeout, value))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.tier.l1.delete(self.make_key(key, version))
+        return self.l2.touch(key, self._seconds(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.tier.l1.delete(self.make_key(key, version))
+        return self.l2.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self._get(key, version)
+            if value is not MISSING:
+                found[key] = unwrap(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, self._seconds(timeout), version)
+        for key, value in data.items():
+            if key not in failed:
+                self.tier.l1.set(
+                    self.make_key(key, version), value,
+                    self._l1_ttl(timeout, value),
+                )
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.tier.l1.delete(self.make_key(key, version))
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self._get(key, version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self.tier.l1.delete(self.make_key(key, version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.tier.l1.clear()
+        self.l2.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        cached = self._get(key, version)
+        if cached is not MISSING and not self._expiring(cached):
+            return unwrap(cached)
+
+        with self.tier.flight(self.make_key(key, version)) as waited:
+            if waited:
+                # Пока ждали, значение посчитал другой поток.
+                self.tier.count('coalesced')
+                fresh = self._get(key, version)
+                if fresh is not MISSING and not self._expiring(fresh):
+                    return unwrap(fresh)
+            lock_key = f'singleflight:{self.make_key(key, version)}'
+            if not self.l2.add(lock_key, 1, self.lock_timeout):
+                if cached is not MISSING:
+                    # Досрочный пересчёт уже идёт в другом процессе.
+                    return unwrap(cached)
+                stored = self._wait_l2(key, version)
+                if stored is not MISSING:
+                    self.tier.count('coalesced')
+                    return unwrap(stored)
+            try:
+                return self._compute(key, default, timeout, version, cached)
+            finally:
+                self.l2.delete(lock_key)
+
+    def _wait_l2(self, key, version):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.l2.get(key, MISSING, version=version)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    def _compute(self, key, default, timeout, version, cached):
+        self.tier.count(
+            'recomputes' if cached is MISSING else 'early_recomputes'
+        )
+        started = time.monotonic()
+        value = default() if callable(default) else default
+        if value is None:
+            return None
+        seconds = self._seconds(timeout)
+        self.set(key, Computed(
+            value,
+            time.monotonic() - started,
+            None if seconds is None else time.time() + seconds,
+        ), timeout, version)
+        return value
+
+    def stats(self):
+        """Попадания, промахи и вытеснения по уровням."""
+
+        stats = Counter(self.tier.stats())
+        return {
+            'l1': {
+                'hits': stats['l1_hits'],
+                'misses': stats['l1_misses'],
+                'evictions': stats['l1_evictions'],
+                'entries': len(self.tier.l1),
+            },
+            'l2': {
+                'hits': stats['l2_hits'],
+                'misses': stats['l2_misses'],
+            },
+            'coalesced': stats['coalesced'],
+            'recomputes': stats['recomputes'],
+            'early_recomputes': stats['early_recomputes'],
+        }
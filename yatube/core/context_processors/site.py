@@ -0,0 +1,29 @@
+"""Контекст, общий для всех запросов сайта.
+
+Значения не зависят от запроса и считаются раз в сутки на процесс,
+а не на каждый рендер.
+"""
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+# (контекст, момент пересчёта) одной парой: потоки видят либо старую,
+# либо новую пару целиком.
+_site_globals = ({}, 0.0)
+
+
+def site_globals(request):
+    """Год для подвала; пересчитывается в полночь."""
+
+    global _site_globals
+    context, expires = _site_globals
+    if time.time() < expires:
+        return context
+    now = timezone.localtime()
+    midnight = (now + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    context = {'year': now.year}
+    _site_globals = (context, midnight.timestamp())
+    return context
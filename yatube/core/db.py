@@ -0,0 +1,49 @@
+"""Настройка соединений с базой: PRAGMA SQLite и проверка живости."""
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """connection_created: PRAGMA из SQLITE_PRAGMAS для нового соединения."""
+
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor.cursor, settings.SQLITE_PRAGMAS)
+
+
+def check_connections(**kwargs):
+    """request_started: закрывает отвалившиеся после простоя соединения.
+
+    При CONN_MAX_AGE соединение переживает запрос, и сервер базы мог
+    его закрыть; Django 2.2 узнал бы об этом только по ошибке запроса.
+    Проверка стоит лишнего запроса к базе, поэтому проверяются только
+    соединения, простоявшие дольше DATABASE_HEALTH_CHECK_IDLE секунд:
+    под нагрузкой соединение уходит из запроса в запрос без неё.
+    """
+
+    now = time.monotonic()
+    idle = settings.DATABASE_HEALTH_CHECK_IDLE
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        idle_since = getattr(connection, 'idle_since', None)
+        if idle_since is not None and now - idle_since < idle:
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+def mark_idle(**kwargs):
+    """request_finished: запоминает, когда соединения начали простаивать."""
+
+    now = time.monotonic()
+    for connection in connections.all():
+        connection.idle_since = now
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stress import stress_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные чтения и записи во временный файл SQLite: '
+        'настройки по умолчанию против SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=3.0)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Падать, если с SQLITE_PRAGMAS были ошибки или чтений '
+                 'не больше, чем по умолчанию.',
+        )
+
+    def handle(self, *args, **options):
+        runs = (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        results = []
+        for title, pragmas in runs:
+            totals = stress_sqlite(
+                pragmas,
+                readers=options['readers'],
+                writers=options['writers'],
+                duration=options['duration'],
+            )
+            duration = options['duration']
+            self.stdout.write(
+                f'{title:16} чтений/с {totals["reads"] / duration:10.0f}  '
+                f'записей/с {totals["writes"] / duration:8.0f}  '
+                f'ошибок {totals["errors"]}'
+            )
+            results.append(totals)
+
+        default, tuned = results
+        if options['check'] and (
+            tuned['errors'] or tuned['reads'] <= default['reads']
+        ):
+            raise CommandError(
+                'SQLITE_PRAGMAS не ускорили чтения под записью.'
+            )
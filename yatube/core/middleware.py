@@ -0,0 +1,63 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .timing import (
+    QueryTimer,
+    RequestTiming,
+    slow_requests,
+    start_timing,
+    stop_timing,
+)
+
+logger = logging.getLogger('yatube.requests')
+
+
+class RequestTimingMiddleware:
+    """Замеряет запрос: общее время, запросы к БД и отрисовку шаблонов.
+
+    Итог уходит в заголовок Server-Timing, строку лога yatube.requests
+    и список самых медленных запросов процесса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming(request.method, request.path)
+        started = time.perf_counter()
+        start_timing(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(QueryTimer(timing))
+                    )
+                response = self.get_response(request)
+        finally:
+            stop_timing()
+        timing.total_ms = (time.perf_counter() - started) * 1000
+        timing.status = response.status_code
+        match = getattr(request, 'resolver_match', None)
+        timing.view_name = match.view_name if match else None
+
+        response['Server-Timing'] = server_timing(timing)
+        logger.info(
+            'request method=%s path=%s view=%s status=%s total_ms=%.2f '
+            'db_queries=%d db_ms=%.2f template_ms=%.2f',
+            timing.method, timing.path, timing.view_name, timing.status,
+            timing.total_ms, timing.db_queries, timing.db_ms,
+            timing.template_ms, extra={'timing': timing.as_dict()},
+        )
+        slow_requests.add(timing)
+        return response
+
+
+def server_timing(timing):
+    return (
+        f'total;dur={timing.total_ms:.2f}, '
+        f'db;dur={timing.db_ms:.2f};desc="{timing.db_queries} queries", '
+        f'tpl;dur={timing.template_ms:.2f}'
+    )
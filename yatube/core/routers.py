@@ -0,0 +1,103 @@
+"""Чтение лент с реплик базы.
+
+View, отмеченные replica_reads, читают модели из
+DATABASE_REPLICA_APPS с одной из реплик DATABASE_REPLICAS. Всё
+остальное, и любая запись, идёт в default. После записи сессия
+DATABASE_REPLICA_STICKY секунд читает только с основной базы, чтобы
+автор сразу увидел свой пост, пока реплика догоняет.
+
+Прочитанное с реплики попадает в общий кеш под текущей версией данных
+(posts.cache). Если версия моложе DATABASE_REPLICA_LAG секунд, реплика
+могла ещё не получить изменение, и запрос дочитывает с основной базы.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_SESSION_KEY = '_primary_until'
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Разрешает view читать с реплики."""
+
+    view.replica_reads = True
+    return view
+
+
+def reset_routing(replica=False):
+    _state.replica = replica
+    _state.wrote = False
+
+
+def read_primary_since(changed_at):
+    """Дальше запрос читает с основной базы, если данные менялись
+    позже, чем DATABASE_REPLICA_LAG секунд назад.
+    """
+
+    if not getattr(_state, 'replica', False):
+        return
+    if changed_at > time.time() - settings.DATABASE_REPLICA_LAG:
+        _state.replica = False
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replica', False):
+            return None
+        if model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return None
+        if not settings.DATABASE_REPLICAS:
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии default, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему на реплики приносит репликация.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплик для отмеченных view.
+
+    Стоит после SessionMiddleware: отметка о записи попадает в сессию
+    до её сохранения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_routing()
+        try:
+            response = self.get_response(request)
+            if settings.DATABASE_REPLICAS and wrote_to_primary():
+                request.session[STICKY_SESSION_KEY] = (
+                    time.time() + settings.DATABASE_REPLICA_STICKY
+                )
+        finally:
+            reset_routing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(view_func, 'replica_reads', False):
+            return None
+        if request.session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return None
+        reset_routing(replica=True)
+        return None
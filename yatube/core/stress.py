@@ -0,0 +1,75 @@
+"""Нагрузка на SQLite параллельными читателями и писателями.
+
+Сравнивает пропускную способность файла базы с настройками по
+умолчанию и с SQLITE_PRAGMAS: каждый поток держит своё соединение,
+читатели выбирают страницу ленты, писатели добавляют записи.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .db import apply_sqlite_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, text TEXT NOT NULL, pub_date REAL NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date, id)',
+)
+FEED_QUERY = (
+    'SELECT id, text FROM post ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+
+
+def stress_sqlite(pragmas, readers=4, writers=2, duration=1.0, seed_rows=1000):
+    """Вернёт число чтений, записей и ошибок за duration секунд."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stress.sqlite3')
+        connection = sqlite3.connect(path)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+            ((f'Пост {i}', i) for i in range(seed_rows)),
+        )
+        connection.commit()
+        connection.close()
+
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def work(write):
+            connection = sqlite3.connect(path, timeout=5)
+            apply_sqlite_pragmas(connection.cursor(), pragmas)
+            done = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    if write:
+                        with connection:
+                            connection.execute(
+                                'INSERT INTO post (text, pub_date) '
+                                'VALUES (?, ?)',
+                                ('Новый пост', time.time()),
+                            )
+                    else:
+                        connection.execute(FEED_QUERY).fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+            connection.close()
+            with lock:
+                totals['writes' if write else 'reads'] += done
+                totals['errors'] += errors
+
+        threads = [
+            threading.Thread(target=work, args=(write,))
+            for write in [False] * readers + [True] * writers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return totals
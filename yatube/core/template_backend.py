@@ -0,0 +1,106 @@
+import copy
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.forms.renderers import get_default_renderer
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import (
+    DjangoTemplates,
+    Template,
+    reraise,
+)
+from django.template.loaders import cached
+
+from .timing import current_timing
+
+logger = logging.getLogger(__name__)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = current_timing()
+        # Вложенные render_to_string уже учтены во внешнем шаблоне.
+        if timing is None or timing.rendering:
+            return super().render(context, request)
+        timing.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_ms += (time.perf_counter() - started) * 1000
+            timing.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в замеры запроса."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def production_templates():
+    """TEMPLATES, как без DEBUG: с кешируемыми загрузчиками."""
+
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for template in templates:
+        template['OPTIONS']['loaders'] = settings.CACHED_TEMPLATE_LOADERS
+    return templates
+
+
+def template_names(engine):
+    """Имена всех шаблонов, которые видят загрузчики движка."""
+
+    names = set()
+    loaders = []
+    for loader in engine.template_loaders:
+        # cached.Loader в Django 2.2 не отдаёт каталоги сам.
+        loaders.extend(getattr(loader, 'loaders', [loader]))
+    for loader in loaders:
+        for directory in loader.get_dirs():
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    names.add(os.path.relpath(path, directory))
+    return sorted(names)
+
+
+def warm_up_templates():
+    """Компилирует все шаблоны, чтобы первые запросы не ждали загрузчики.
+
+    Прогреваются только движки с cached.Loader, остальные всё равно
+    компилируют шаблон на каждый запрос. Вернёт число шаблонов.
+    """
+
+    backends = list(engines.all())
+    renderer = get_default_renderer()
+    if hasattr(renderer, 'engine'):
+        # Виджеты форм рисует отдельный движок рендерера форм.
+        backends.append(renderer.engine)
+    compiled = 0
+    for backend in backends:
+        if not isinstance(backend, DjangoTemplates) or not any(
+            isinstance(loader, cached.Loader)
+            for loader in backend.engine.template_loaders
+        ):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.get_template(name)
+            except (
+                TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError
+            ) as error:
+                # Например, шаблон приложения для чужих тегов или не HTML.
+                logger.debug('Шаблон %s не прогрет: %s', name, error)
+                continue
+            compiled += 1
+    return compiled
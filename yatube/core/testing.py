@@ -0,0 +1,79 @@
+import time
+from contextlib import ContextDecorator, contextmanager
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Template
+from django.test.utils import CaptureQueriesContext
+
+
+class max_queries(ContextDecorator):
+    """Падает, если код внутри выполнил больше limit запросов к БД.
+
+    Работает и как контекстный менеджер, и как декоратор теста:
+
+        with max_queries(3):
+            self.client.get(url)
+    """
+
+    def __init__(self, limit, using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        self.using = using
+
+    def __enter__(self):
+        self.captured = CaptureQueriesContext(connections[self.using])
+        self.captured.__enter__()
+        return self.captured
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.captured.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.captured)
+        if executed > self.limit:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    self.captured.captured_queries, start=1
+                )
+            )
+            raise AssertionError(
+                f'Выполнено {executed} запросов при лимите {self.limit}:\n'
+                f'{queries}'
+            )
+        return False
+
+
+@contextmanager
+def slow_database(delay):
+    """Добавляет delay секунд к каждому запросу к БД во всех потоках."""
+
+    execute = CursorWrapper._execute
+
+    def slow_execute(self, *args, **kwargs):
+        time.sleep(delay)
+        return execute(self, *args, **kwargs)
+
+    with mock.patch.object(CursorWrapper, '_execute', slow_execute):
+        yield
+
+
+@contextmanager
+def template_compiles():
+    """Считает компиляции шаблонов; счётчик — список в as.
+
+        with template_compiles() as compiled:
+            self.client.get(url)
+        self.assertEqual(compiled, [])
+    """
+
+    compiled = []
+    compile_nodelist = Template.compile_nodelist
+
+    def counting_compile(self):
+        compiled.append(self.origin.template_name)
+        return compile_nodelist(self)
+
+    with mock.patch.object(Template, 'compile_nodelist', counting_compile):
+        yield compiled
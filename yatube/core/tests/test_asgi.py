@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import TransactionTestCase
+
+from posts.models import Post
+
+from ..asgi import ASGIHandler
+from ..testing import slow_database
+
+User = get_user_model()
+
+# Задержка каждого запроса к БД в нагрузочном тесте, секунды.
+DELAY = 0.1
+CONCURRENCY = 8
+# Сколько секунд тест ждёт событие, прежде чем считать его не наступившим.
+WAIT = 5
+
+
+def http_scope(path):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+
+
+async def asgi_get(application, path):
+    """Запрос GET к ASGI-приложению; вернёт статус и тело."""
+
+    messages = []
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b''}
+        # Как у настоящего сервера: после тела — только отключение.
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(http_scope(path), receive, send)
+    finished.set()
+    body = b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+    return messages[0]['status'], body
+
+
+def endless_stream(produced, closed):
+    """WSGI-приложение с бесконечным потоковым ответом."""
+
+    def application(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+
+        def chunks():
+            try:
+                while True:
+                    produced.append(len(produced))
+                    yield b'chunk'
+            finally:
+                closed.set()
+        return chunks()
+    return application
+
+
+class ASGIHandlerTest(TransactionTestCase):
+    """ASGI поверх WSGI: параллельные view, потоки и медленные клиенты."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(CONCURRENCY)
+        ]
+        self.paths = [f'/posts/{post.pk}/' for post in posts]
+        self.application = ASGIHandler(WSGIHandler(), CONCURRENCY)
+
+    def tearDown(self):
+        self.application.executor.shutdown(wait=True)
+
+    def test_streaming_response(self):
+        """Потоковые ленты проходят через ASGI целиком."""
+
+        status, body = asyncio.run(
+            asgi_get(self.application, '/feeds/json/')
+        )
+        self.assertEqual(status, 200)
+        self.assertIn('Пост 0', body.decode())
+
+    def test_views_run_concurrently(self):
+        """Запросы выполняются параллельно, а не по очереди.
+
+        Каждый view ждёт у барьера, пока не придут все остальные: при
+        последовательной обработке барьер не пройдёт ни один запрос.
+        """
+
+        barrier = threading.Barrier(CONCURRENCY, timeout=WAIT)
+        handler = WSGIHandler()
+
+        def application(environ, start_response):
+            barrier.wait()
+            return handler(environ, start_response)
+
+        self.application.application = application
+
+        async def load():
+            return await asyncio.gather(*(
+                asgi_get(self.application, path) for path in self.paths
+            ))
+
+        responses = asyncio.run(load())
+        self.assertEqual({status for status, _ in responses}, {200})
+
+    def test_concurrency_under_slow_database(self):
+        """С медленной базой параллельные запросы заметно быстрее очереди.
+
+        Задержка одинакова для каждого запроса к БД, и при CONCURRENCY
+        потоках выигрыш близок к CONCURRENCY раз; проверяется лишь
+        двукратный, чтобы тест не зависел от загрузки машины.
+        """
+
+        async def sequential():
+            return [
+                await asgi_get(self.application, path)
+                for path in self.paths
+            ]
+
+        async def concurrent():
+            return await asyncio.gather(*(
+                asgi_get(self.application, path) for path in self.paths
+            ))
+
+        timings = {}
+        with slow_database(DELAY):
+            for name, load in (
+                ('sequential', sequential), ('concurrent', concurrent)
+            ):
+                cache.clear()
+                started = time.perf_counter()
+                responses = asyncio.run(load())
+                timings[name] = time.perf_counter() - started
+                self.assertEqual(
+                    {status for status, _ in responses}, {200}
+                )
+        self.assertLess(timings['concurrent'], timings['sequential'] / 2)
+
+    def test_slow_client_holds_back_view(self):
+        """Поток view не обгоняет медленного клиента больше чем на очередь."""
+
+        produced, closed = [], threading.Event()
+        application = ASGIHandler(endless_stream(produced, closed), 1, 2)
+
+        async def run():
+            body_sent = asyncio.Event()
+            release = asyncio.Event()
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b''}
+                await release.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.body':
+                    body_sent.set()
+                    await release.wait()
+
+            request = asyncio.ensure_future(
+                application(http_scope('/'), receive, send)
+            )
+            await asyncio.wait_for(body_sent.wait(), WAIT)
+            # Клиент стоит на первом куске: поток view должен
+            # остановиться, заполнив очередь.
+            await asyncio.sleep(0.2)
+            buffered = len(produced)
+            release.set()
+            await asyncio.wait_for(request, WAIT)
+            return buffered
+
+        try:
+            buffered = asyncio.run(run())
+        finally:
+            application.executor.shutdown(wait=True)
+        self.assertLessEqual(buffered, 5)
+        self.assertTrue(closed.is_set())
+
+    def test_disconnect_stops_stream(self):
+        """Отключение клиента закрывает итератор ответа."""
+
+        produced, closed = [], threading.Event()
+        application = ASGIHandler(endless_stream(produced, closed), 1, 2)
+
+        async def run():
+            chunks = 0
+            disconnected = asyncio.Event()
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b''}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal chunks
+                if message['type'] == 'http.response.body':
+                    chunks += 1
+                    if chunks == 3:
+                        disconnected.set()
+
+            await asyncio.wait_for(
+                application(http_scope('/'), receive, send), WAIT
+            )
+
+        try:
+            asyncio.run(run())
+        finally:
+            application.executor.shutdown(wait=True)
+        self.assertTrue(closed.is_set())
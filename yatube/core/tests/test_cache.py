@@ -0,0 +1,141 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import Computed
+
+User = get_user_model()
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tiered': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'test-tiered',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 3,
+            'L1_TIMEOUT': 0.2,
+            'POLL_INTERVAL': 0.01,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['tiered']
+        self.l2 = caches['shared']
+        self.cache.clear()
+        self.cache.tier.reset_stats()
+
+    def test_reads_from_l1(self):
+        self.cache.set('key', {'value': 1})
+        value = self.cache.get('key')
+        value['value'] = 2
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        stats = self.cache.stats()
+        self.assertEqual(stats['l1']['hits'], 2)
+        self.assertEqual(stats['l2']['hits'], 0)
+
+    def test_lru_eviction_falls_back_to_l2(self):
+        """Вытесненный из L1 ключ читается из L2 и возвращается в L1."""
+
+        for key in 'abcd':
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.stats()['l1']['evictions'], 1)
+        self.assertEqual(self.cache.get('a'), 'a')
+        stats = self.cache.stats()
+        self.assertEqual(stats['l2']['hits'], 1)
+        self.assertEqual(stats['l1']['entries'], 3)
+
+    def test_l1_expires_writes_of_other_processes(self):
+        """Запись другого процесса в L2 видна после L1_TIMEOUT."""
+
+        self.cache.set('key', 'old')
+        self.l2.set('key', 'new')
+        self.assertEqual(self.cache.get('key'), 'old')
+        time.sleep(0.25)
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_delete_and_clear_both_tiers(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNone(self.l2.get('a'))
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи по горячему ключу считают значение раз."""
+
+        calls = []
+
+        def compute():
+            calls.append(True)
+            time.sleep(0.1)
+            return 'page'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_set('hot', compute, 60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['page'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()['coalesced'], 7)
+
+    def test_waits_for_other_process(self):
+        """Если ключ считает другой процесс, его значение ждут в L2."""
+
+        key = self.cache.make_key('hot')
+        self.l2.add(f'singleflight:{key}', 1, 10)
+        threading.Timer(0.05, self.l2.set, ['hot', 'remote', 60]).start()
+        compute = mock.Mock(return_value='local')
+        self.assertEqual(self.cache.get_or_set('hot', compute, 60), 'remote')
+        compute.assert_not_called()
+
+    def test_early_recompute(self):
+        """XFetch пересчитывает значение, которое вот-вот истечёт."""
+
+        self.cache.set('key', Computed('old', 10.0, time.time() + 1), 60)
+        with mock.patch('core.cache.random.random', return_value=0.5):
+            value = self.cache.get_or_set('key', lambda: 'new', 60)
+        self.assertEqual(value, 'new')
+        self.assertEqual(self.cache.stats()['early_recomputes'], 1)
+
+    def test_fresh_value_not_recomputed(self):
+        self.cache.set('key', Computed('old', 0.01, time.time() + 60), 60)
+        compute = mock.Mock(return_value='new')
+        self.assertEqual(self.cache.get_or_set('key', compute, 60), 'old')
+        compute.assert_not_called()
+
+
+@override_settings(CACHES=CACHES)
+class CacheStatsViewTest(TestCase):
+    def test_staff_only(self):
+        url = reverse('core:cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tiered', response.context['stats'])
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..context_processors import site
+
+
+class SiteGlobalsTest(TestCase):
+    def setUp(self):
+        site._site_globals = ({}, 0.0)
+
+    def test_year_in_footer(self):
+        """В подвале страницы текущий год."""
+
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.context['year'], timezone.now().year)
+        self.assertContains(response, f'© {timezone.now().year}')
+
+    def test_site_globals_computed_once(self):
+        """Год считается один раз, а не на каждый рендер."""
+
+        with mock.patch.object(
+            site.timezone, 'localtime', wraps=timezone.localtime
+        ) as localtime:
+            for _ in range(3):
+                self.client.get(reverse('about:author'))
+        self.assertEqual(localtime.call_count, 1)
+
+    def test_site_globals_expire_at_midnight(self):
+        """После полуночи значения пересчитываются."""
+
+        request = RequestFactory().get('/')
+        context = site.site_globals(request)
+        self.assertIs(site.site_globals(request), context)
+        expires = site._site_globals[1]
+        with mock.patch.object(site.time, 'time', return_value=expires):
+            self.assertIsNot(site.site_globals(request), context)
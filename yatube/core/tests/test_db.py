@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+
+from ..db import check_connections, mark_idle
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        connections.databases['pragmas'] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(self.directory, 'db.sqlite3'),
+            TEST={},
+        )
+
+    def tearDown(self):
+        connections['pragmas'].close()
+        del connections.databases['pragmas']
+        delattr(connections._connections, 'pragmas')
+        shutil.rmtree(self.directory)
+
+    def test_new_connection_is_tuned(self):
+        """Новое соединение с файлом SQLite получает SQLITE_PRAGMAS."""
+
+        with connections['pragmas'].cursor() as cursor:
+            for name, expected in (
+                ('journal_mode', 'wal'),
+                ('synchronous', 1),
+                ('mmap_size', settings.SQLITE_PRAGMAS['mmap_size']),
+                ('busy_timeout', settings.SQLITE_PRAGMAS['busy_timeout']),
+            ):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], expected)
+
+
+class ConnectionHealthCheckTest(TestCase):
+    def setUp(self):
+        self.connection = connections['default']
+        self.connection.ensure_connection()
+        # Время простоя осталось от запросов других тестов.
+        vars(self.connection).pop('idle_since', None)
+
+    def test_broken_connection_closed_on_request_start(self):
+        """Перед запросом отвалившееся соединение закрывается."""
+
+        connection = self.connection
+        with mock.patch.object(connection, 'close') as close:
+            check_connections()
+            close.assert_not_called()
+            with mock.patch.object(
+                connection, 'is_usable', return_value=False
+            ):
+                check_connections()
+        close.assert_called_once_with()
+
+    def test_busy_connection_is_not_checked(self):
+        """Соединение сразу после запроса не проверяется лишним запросом."""
+
+        mark_idle()
+        with mock.patch.object(self.connection, 'is_usable') as is_usable:
+            check_connections()
+        is_usable.assert_not_called()
+
+        self.connection.idle_since -= settings.DATABASE_HEALTH_CHECK_IDLE
+        with mock.patch.object(
+            self.connection, 'is_usable', return_value=True
+        ) as is_usable:
+            check_connections()
+        is_usable.assert_called_once_with()
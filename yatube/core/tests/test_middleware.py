@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..timing import slow_requests
+
+User = get_user_model()
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        slow_requests.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+
+    def test_server_timing_header(self):
+        """Ответ несёт Server-Timing с БД и шаблонами."""
+
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        header = response['Server-Timing']
+        self.assertIn('total;dur=', header)
+        self.assertIn('db;dur=', header)
+        self.assertIn('tpl;dur=', header)
+        self.assertIn('post_detail status=200', logs.output[0])
+        self.assertTrue(
+            logs.records[0].timing['view'].endswith(':post_detail')
+        )
+        self.assertGreater(logs.records[0].timing['db_queries'], 0)
+
+    def test_slow_requests_keep_slowest(self):
+        """В списке остаются самые медленные запросы, по убыванию."""
+
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=[self.user.username]))
+        records = slow_requests.slowest()
+        self.assertEqual(len(records), 2)
+        self.assertGreaterEqual(records[0]['total_ms'], records[1]['total_ms'])
+
+    def test_slow_requests_page_for_staff_only(self):
+        """Страница медленных запросов закрыта от всех, кроме персонала."""
+
+        url = reverse('core:slow_requests')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.get(reverse('posts:index'))
+        response = self.staff_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            '/', [item['path'] for item in response.context['requests']]
+        )
@@ -0,0 +1,112 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_REPLICA_LAG=0)
+class ReplicaRoutingTest(TransactionTestCase):
+    """default — основная база, replica — её копия в отдельном файле.
+
+    Снимок не обновляется сам, то есть реплика отстаёт сколько угодно;
+    DATABASE_REPLICA_LAG=0 — кроме тестов, где это важно.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.old_post = Post.objects.create(
+            author=self.author, text='Пост, который есть на реплике'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.replicate()
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+        shutil.rmtree(self.directory)
+
+    def replicate(self):
+        """Снимок основной базы в файл реплики вместо репликации."""
+
+        path = os.path.join(self.directory, 'replica.sqlite3')
+        target = sqlite3.connect(path)
+        connections['default'].ensure_connection()
+        connections['default'].connection.backup(target)
+        target.close()
+        connections.databases['replica'] = dict(
+            connections.databases['default'], NAME=path, TEST={}
+        )
+
+    def test_feeds_read_from_replica(self):
+        """Ленты и посты читаются с реплики, не видя свежих записей."""
+
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:post_detail', args=[self.old_post.pk])
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:post_detail', args=[new_post.pk])
+            ).status_code,
+            404,
+        )
+
+    def test_read_your_writes_after_post_create(self):
+        """Автор видит новый пост сразу после записи, гости — с реплики."""
+
+        author_client = Client()
+        author_client.force_login(self.author)
+        response = author_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}, follow=True
+        )
+        self.assertIn(
+            'Свежий пост',
+            [post.excerpt for post in response.context['page_obj']],
+        )
+        self.assertTrue(Post.objects.filter(text='Свежий пост').exists())
+
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertNotIn(
+            'Свежий пост',
+            [post.excerpt for post in response.context['page_obj']],
+        )
+
+    @override_settings(DATABASE_REPLICA_LAG=10)
+    def test_lagging_replica_does_not_fill_cache(self):
+        """Старая копия поста с реплики не ложится в кеш после правки."""
+
+        self.old_post.text = 'Правка, которой нет на реплике'
+        self.old_post.save()
+        detail_url = reverse('posts:post_detail', args=[self.old_post.pk])
+        index_url = reverse('posts:index')
+        self.assertContains(
+            self.client.get(detail_url), 'Правка, которой нет на реплике'
+        )
+        self.assertContains(
+            self.client.get(index_url), 'Правка, которой нет на реплике'
+        )
+
+        # Окно отставания прошло: запросы идут на реплику, но кеш
+        # под новыми версиями уже заполнен свежими данными.
+        with override_settings(DATABASE_REPLICA_LAG=0):
+            for url in (detail_url, index_url):
+                self.assertContains(
+                    self.client.get(url), 'Правка, которой нет на реплике'
+                )
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+from ..template_backend import production_templates, warm_up_templates
+from ..testing import template_compiles
+
+User = get_user_model()
+
+
+@override_settings(TEMPLATES=production_templates())
+class CachedTemplatesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_no_compiles_after_warm_up(self):
+        """После прогрева запросы не компилируют шаблоны."""
+
+        self.assertGreater(warm_up_templates(), 0)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[self.post.pk]),
+            reverse('about:author'),
+            reverse('users:signup'),
+        )
+        with template_compiles() as compiled:
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(compiled, [])
@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import threading
+import time
+
+from django.conf import settings
+
+_local = threading.local()
+
+
+class RequestTiming:
+    """Замеры одного запроса: БД, шаблоны и итоговое время."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.view_name = None
+        self.status = None
+        self.started = time.time()
+        self.total_ms = 0.0
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.rendering = False
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'view': self.view_name,
+            'status': self.status,
+            'started': self.started,
+            'total_ms': round(self.total_ms, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_ms, 2),
+            'template_ms': round(self.template_ms, 2),
+        }
+
+
+def current_timing():
+    """Замеры запроса, который сейчас обрабатывает этот поток."""
+
+    return getattr(_local, 'timing', None)
+
+
+def start_timing(timing):
+    _local.timing = timing
+
+
+def stop_timing():
+    _local.timing = None
+
+
+class QueryTimer:
+    """execute_wrapper: считает запросы и время в базе."""
+
+    def __init__(self, timing):
+        self.timing = timing
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timing.db_queries += 1
+            self.timing.db_ms += (time.perf_counter() - started) * 1000
+
+
+class SlowRequestLog:
+    """Самые медленные запросы процесса, не больше size штук.
+
+    Без size берётся REQUEST_TIMING_SLOW_LOG_SIZE.
+    """
+
+    def __init__(self, size=None):
+        self.size = size
+        self._heap = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, timing):
+        size = self.size
+        if size is None:
+            size = settings.REQUEST_TIMING_SLOW_LOG_SIZE
+        if size <= 0:
+            return
+        entry = (timing.total_ms, next(self._order), timing.as_dict())
+        with self._lock:
+            if len(self._heap) < size:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self):
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [record for _, _, record in entries]
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+
+
+slow_requests = SlowRequestLog()
@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path(
+        'slow-requests/',
+        views.slow_request_list,
+        name='slow_requests'
+    ),
+    path(
+        'cache-stats/',
+        views.cache_stats,
+        name='cache_stats'
+    ),
+]
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.shortcuts import render
+
+from .timing import slow_requests
+
+
+@staff_member_required
+def slow_request_list(request):
+    """Самые медленные запросы этого процесса, только для персонала."""
+
+    template = 'core/slow_requests.html'
+    context = {
+        'title': 'Медленные запросы',
+        'requests': slow_requests.slowest(),
+    }
+    return render(request, template, context)
+
+
+@staff_member_required
+def cache_stats(request):
+    """Попадания, промахи и вытеснения двухуровневых кешей процесса."""
+
+    template = 'core/cache_stats.html'
+    context = {
+        'title': 'Кеш',
+        'stats': {
+            alias: caches[alias].stats()
+            for alias in settings.CACHES
+            if hasattr(caches[alias], 'stats')
+        },
+    }
+    return render(request, template, context)
@@ -1,21 +1,38 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
 from .models import Post, Group
+from .search import search_posts
+
+
+class PostChangeList(ChangeList):
+    def get_queryset(self, request):
+        # Список выводит excerpt, полный текст нужен только форме поста.
+        return super().get_queryset(request).defer('text')
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
-        'text',
+        'excerpt',
         'pub_date',
         'author',
         'group',
     )
     list_editable = 'group',
+    list_select_related = 'author', 'group'
     search_fields = 'text',
     list_filter = 'pub_date',
     empty_value_display = '-пусто-'
 
+    def get_changelist(self, request, **kwargs):
+        return PostChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 
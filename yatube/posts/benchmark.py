@@ -0,0 +1,316 @@
+"""Замеры скорости страниц из posts.urls на синтетических данных.
+
+Каждая страница прогоняется через тестовый клиент: сначала серия
+запросов для p50/p95, затем по одному запросу для подсчёта запросов
+к БД и пикового потребления памяти, чтобы замеры не мешали друг
+другу.
+"""
+import copy
+import random
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection, reset_queries
+from django.template.loader import get_template
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from core.context_processors.site import site_globals
+from core.testing import template_compiles
+
+from .counters import recount_posts
+from .models import Group, Post, Subscription, User, make_excerpt
+from .urls import urlpatterns
+from .utils import WindowPaginator
+
+# Бэкенд, которым бенчмарк подменяет настроенные кеши.
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+Scenario = namedtuple('Scenario', 'name method url data authorized')
+Dataset = namedtuple('Dataset', 'author group post')
+
+
+def benchmark_caches():
+    """CACHES для замера: те же уровни, но в своей памяти процесса.
+
+    Сид данных и сбросы при записи не трогают настроенный кеш,
+    например общий memcached.
+    """
+
+    configs = copy.deepcopy(settings.CACHES)
+    for alias, config in configs.items():
+        config['LOCATION'] = f'benchmark-{alias}'
+        if config['BACKEND'] != 'core.cache.TieredCache':
+            config['BACKEND'] = LOCMEM_BACKEND
+            config.pop('OPTIONS', None)
+    return configs
+
+
+def seed_dataset(posts=1000, authors=20, groups=5, seed=None):
+    """Наполняет базу авторами, группами, постами Faker и подписками."""
+
+    rng = random.Random(seed)
+    users = mixer.cycle(authors).blend(
+        User, username=mixer.sequence('author_{0}')
+    )
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('group-{0}')
+    )
+    texts = (mixer.faker.text(280) for _ in range(posts))
+    Post.objects.bulk_create(
+        Post(
+            text=text,
+            excerpt=make_excerpt(text),
+            author=rng.choice(users),
+            group=rng.choice(group_list + [None]),
+        )
+        for text in texts
+    )
+    recount_posts()
+    for user in users:
+        for followed in rng.sample(users, min(3, len(users))):
+            if followed != user:
+                Subscription.objects.create(user=user, author=followed)
+        Subscription.objects.create(user=user, group=rng.choice(group_list))
+    author = users[0]
+    return Dataset(
+        author=author,
+        group=group_list[0],
+        post=Post.objects.filter(author=author).first()
+        or Post.objects.create(author=author, text=mixer.faker.text(280)),
+    )
+
+
+def build_scenarios(dataset):
+    """По сценарию на каждый URL из posts.urls."""
+
+    kwargs = {
+        'index_feed': {'fmt': 'atom'},
+        'group_list': {'slug': dataset.group.slug},
+        'group_feed': {'slug': dataset.group.slug, 'fmt': 'rss'},
+        'post_detail': {'post_id': dataset.post.pk},
+        'post_edit': {'post_id': dataset.post.pk},
+        'profile': {'username': dataset.author.username},
+        'profile_feed': {'username': dataset.author.username, 'fmt': 'json'},
+    }
+    authorized = {'follow_index', 'post_create', 'post_edit'}
+    # Подписка и отписка — действия по POST, а не страницы.
+    actions = {
+        'group_follow', 'group_unfollow', 'profile_follow', 'profile_unfollow',
+    }
+    scenarios = []
+    for pattern in urlpatterns:
+        name = pattern.name
+        if name in actions:
+            continue
+        url = reverse(f'posts:{name}', kwargs=kwargs.get(name))
+        data = {'q': 'et'} if name == 'search' else None
+        scenarios.append(
+            Scenario(f'posts:{name}', 'get', url, data, name in authorized)
+        )
+    scenarios.append(Scenario(
+        'posts:post_create (POST)', 'post', reverse('posts:post_create'),
+        {'text': 'Пост из бенчмарка', 'group': dataset.group.pk}, True,
+    ))
+    return scenarios
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def run_scenario(scenario, client, iterations, warmup):
+    def request():
+        response = getattr(client, scenario.method)(
+            scenario.url, scenario.data
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        else:
+            response.content
+        return response
+
+    for _ in range(warmup):
+        request()
+    timings = []
+    with template_compiles() as compiled:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    # Журнал запросов чистится в начале каждого запроса клиента,
+    # поэтому перед подсчётом он должен быть пуст.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        status = request().status_code
+    # captured_queries читает журнал соединения лениво, а следующий
+    # запрос клиента его очистит.
+    query_count = len(queries)
+
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'template_compiles': len(compiled),
+    }
+
+
+def run_benchmarks(dataset, iterations=50, warmup=5, only=None):
+    guest = Client()
+    member = Client()
+    member.force_login(dataset.author)
+    results = {}
+    for scenario in build_scenarios(dataset):
+        if only and scenario.name not in only:
+            continue
+        client = member if scenario.authorized else guest
+        results[scenario.name] = run_scenario(
+            scenario, client, iterations, warmup
+        )
+    return results
+
+
+def per_render_year(request):
+    """Процессор года до site_globals: дата считается на каждый рендер."""
+
+    return {'year': timezone.now().year}
+
+
+def context_overhead(variants, iterations=20000, repeat=5):
+    """Сколько микросекунд на рендер уходит на контекст-процессор.
+
+    variants — {имя: процессор}. Процессор вызывается так же, как
+    RequestContext.bind_template перед каждым рендером. Из результата
+    вычитается пустой цикл. Серии идут вперемешку, и от каждого
+    варианта берётся самая быстрая: она меньше всего зашумлена.
+    """
+
+    request = RequestFactory().get('/')
+    variants = {**variants, None: lambda request: {}}
+    best = dict.fromkeys(variants, float('inf'))
+    for _ in range(repeat + 1):
+        for name, processor in variants.items():
+            started = time.perf_counter()
+            for _ in range(iterations):
+                processor(request)
+            best[name] = min(best[name], time.perf_counter() - started)
+    bare = best.pop(None)
+    return {
+        name: round(max(elapsed - bare, 0.0) / iterations * 1e6, 3)
+        for name, elapsed in best.items()
+    }
+
+
+def compare_context_processors(iterations=20000):
+    """Цена года на рендер: прежний процессор против site_globals."""
+
+    return context_overhead({
+        'per_render_us': per_render_year,
+        'site_globals_us': site_globals,
+    }, iterations)
+
+
+def compare_feed_rows(iterations=50):
+    """Время и память на страницу ленты: модели против FeedRow.
+
+    Память — сколько занимает собранная страница, пока она жива.
+    """
+
+    per_page = settings.PAGINATOR_POST_COUNT
+    variants = {'models': Post.objects.feed, 'rows': Post.objects.rows}
+    results = {}
+    for name, queryset in variants.items():
+        list(queryset()[:per_page])
+        started = time.perf_counter()
+        for _ in range(iterations):
+            list(queryset()[:per_page])
+        elapsed = (time.perf_counter() - started) / iterations * 1000
+        tracemalloc.start()
+        page = list(queryset()[:per_page])
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del page
+        results[name] = {
+            'ms': round(elapsed, 3),
+            'kb': round(held / 1024, 1),
+        }
+    return results
+
+
+def paginator_render_cost(post_counts=(1000, 100000, 10000000),
+                          iterations=200):
+    """Цена includes/paginator.html на середине ленты разной длины.
+
+    Пагинатор строится над range, так что замеряется только разметка
+    номеров страниц: {число постов: (мкс на рендер, байт)}.
+    """
+
+    template = get_template('includes/paginator.html')
+    results = {}
+    for count in post_counts:
+        paginator = WindowPaginator(
+            range(count), settings.PAGINATOR_POST_COUNT
+        )
+        page = paginator.get_page(paginator.num_pages // 2)
+        context = {'page_obj': page, 'page_query': ''}
+        html = template.render(context)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            template.render(context)
+        elapsed = (time.perf_counter() - started) / iterations * 1e6
+        results[count] = (round(elapsed, 1), len(html.encode()))
+    return results
+
+
+def steady_state_compiles(results):
+    """Страницы, которые после прогрева всё ещё компилируют шаблоны."""
+
+    return [
+        f'{name}: {result["template_compiles"]} компиляций шаблонов'
+        for name, result in results.items()
+        if result['template_compiles']
+    ]
+
+
+def compare_results(results, baseline, threshold):
+    """Список регрессий относительно baseline.
+
+    Регрессия — p95 выросло больше чем в (1 + threshold) раз
+    или стало больше запросов к БД.
+    """
+
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        limit = previous['p95_ms'] * (1 + threshold)
+        if current['p95_ms'] > limit:
+            regressions.append(
+                f'{name}: p95 {current["p95_ms"]} мс '
+                f'против {previous["p95_ms"]} мс'
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: {current["queries"]} запросов '
+                f'против {previous["queries"]}'
+            )
+    return regressions
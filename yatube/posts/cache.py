@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.routers import read_primary_since
+
+FEED_INDEX = 'index'
+FEED_GROUP = 'group'
+FEED_PROFILE = 'profile'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record_fragment(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def fragment_cache_stats():
+    """Попадания и промахи кеша фрагментов лент в этом процессе."""
+
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_fragment_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _version_key(feed, key):
+    return f'feed:version:{feed}:{key}'
+
+
+def _versions():
+    # Версии читаются мимо L1: иначе сброс из другого процесса был бы
+    # виден здесь только через L1_TIMEOUT.
+    return caches[settings.VERSION_CACHE]
+
+
+def _current_version(version_key, initial=None):
+    versions = _versions()
+    version = versions.get(version_key)
+    if version is None:
+        versions.add(version_key, initial or time.time(), None)
+        version = versions.get(version_key)
+    read_primary_since(version)
+    return version
+
+
+def _peek_version(version_key):
+    version = _versions().get(version_key)
+    if version is not None:
+        read_primary_since(version)
+    return version
+
+
+def feed_version(feed, key):
+    """Версия ленты группы или автора: время её последнего изменения."""
+
+    return _current_version(_version_key(feed, key))
+
+
+def peek_feed_version(feed, key):
+    """Версия ленты или None, если её ещё нет; новую не заводит."""
+
+    return _peek_version(_version_key(feed, key))
+
+
+def touch_feed(feed, key):
+    """Помечает ленту изменённой: её фрагменты больше не читаются."""
+
+    _versions().set(_version_key(feed, key), time.time(), None)
+
+
+def post_version(post_id, initial=None):
+    """Версия поста: время его последней правки.
+
+    Если версии ещё нет, заводится initial, по умолчанию текущее время.
+    """
+
+    return _current_version(f'post:version:{post_id}', initial)
+
+
+def peek_post_version(post_id):
+    """Версия поста или None, если её ещё нет; новую не заводит."""
+
+    return _peek_version(f'post:version:{post_id}')
+
+
+def touch_post(post_id):
+    """Помечает пост изменённым: его копия в кеше больше не читается."""
+
+    _versions().set(f'post:version:{post_id}', time.time(), None)
+
+
+def fragment_key(feed, key, page):
+    return f'feed:fragment:{feed}:{key}:{feed_version(feed, key)}:{page}'
+
+
+def forget_feeds(group_slugs=(), usernames=(), index=True):
+    """Вычищает из кеша фрагменты затронутых записью лент."""
+
+    for slug in group_slugs:
+        touch_feed(FEED_GROUP, slug)
+    for username in usernames:
+        touch_feed(FEED_PROFILE, username)
+    if index:
+        touch_feed(FEED_INDEX, '')
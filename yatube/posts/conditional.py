@@ -0,0 +1,77 @@
+"""ETag и Last-Modified страниц постов для декоратора condition.
+
+Страница не менялась, пока не менялись версии лент, из которых она
+собрана (см. posts.cache). ETag учитывает пользователя: шапка и
+кнопки зависят от того, кто смотрит. У вошедшего в ETag входит и его
+CSRF-cookie: формы подписки несут токен, а после нового входа старый
+токен не принимается. Last-Modified отдаётся только гостям — по нему
+нельзя отличить вход на сайт от старой копии.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from .cache import FEED_GROUP, FEED_INDEX, FEED_PROFILE, feed_version
+from .lookups import find_author, find_group
+from .objects import load_post, source_versions
+
+
+def index_versions(request, **kwargs):
+    return [feed_version(FEED_INDEX, '')]
+
+
+# Несуществующей группе или автору версия не заводится: страница
+# отдаст 404 без ETag.
+def group_versions(request, slug, **kwargs):
+    if not find_group(slug):
+        return None
+    return [feed_version(FEED_GROUP, slug)]
+
+
+def profile_versions(request, username, **kwargs):
+    if not find_author(username):
+        return None
+    return [feed_version(FEED_PROFILE, username)]
+
+
+def post_versions(request, post_id):
+    post = load_post(post_id)
+    if post is None:
+        return None
+    return source_versions(post)
+
+
+def viewer_token(request):
+    if not request.user.is_authenticated:
+        return '0'
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    digest = hashlib.sha256(csrf.encode()).hexdigest()[:16]
+    return f'{request.user.pk}.{digest}'
+
+
+def feed_condition(get_versions):
+    """condition(), ETag и Last-Modified которого берутся из версий лент."""
+
+    def versions(request, *args, **kwargs):
+        cached = getattr(request, '_feed_versions', None)
+        if cached is None:
+            cached = get_versions(request, *args, **kwargs)
+            request._feed_versions = cached
+        return cached
+
+    def etag(request, *args, **kwargs):
+        current = versions(request, *args, **kwargs)
+        if current is None:
+            return None
+        tokens = ':'.join(f'{version:.6f}' for version in current)
+        return f'{tokens}-{viewer_token(request)}'
+
+    def last_modified(request, *args, **kwargs):
+        current = versions(request, *args, **kwargs)
+        if current is None or request.user.is_authenticated:
+            return None
+        return datetime.fromtimestamp(max(current), timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
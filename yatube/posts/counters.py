@@ -0,0 +1,94 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Group, Post
+
+
+def change_author_stat(author_id, field, delta):
+    """Сдвигает счётчик field в AuthorStats автора на delta."""
+
+    if author_id is None or not delta:
+        return
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    if stats.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=author_id, **{field: delta})
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        stats.update(**{field: F(field) + delta})
+
+
+def change_group_stat(group_id, field, delta):
+    """Сдвигает счётчик field группы на delta."""
+
+    if group_id is None or not delta:
+        return
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(**{f'{field}__gte': -delta})
+    groups.update(**{field: F(field) + delta})
+
+
+def change_author_posts(author_id, delta):
+    change_author_stat(author_id, 'posts_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    change_group_stat(group_id, 'posts_count', delta)
+
+
+def change_author_followers(author_id, delta):
+    change_author_stat(author_id, 'followers_count', delta)
+
+
+def change_group_followers(group_id, delta):
+    change_group_stat(group_id, 'followers_count', delta)
+
+
+def author_posts_count(author):
+    """Число постов автора без COUNT(*) по таблице постов."""
+
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def recount_posts():
+    """Пересчитывает счётчики по таблице постов.
+
+    Возвращает число исправленных счётчиков авторов и групп.
+    """
+
+    fixed_authors = fixed_groups = 0
+    with transaction.atomic():
+        actual = dict(
+            Post.objects.order_by().values_list('author_id')
+            .annotate(total=Count('id'))
+        )
+        for stats in AuthorStats.objects.select_for_update():
+            total = actual.pop(stats.author_id, 0)
+            if stats.posts_count != total:
+                stats.posts_count = total
+                stats.save(update_fields=['posts_count'])
+                fixed_authors += 1
+        AuthorStats.objects.bulk_create(
+            AuthorStats(author_id=author_id, posts_count=total)
+            for author_id, total in actual.items()
+        )
+        fixed_authors += len(actual)
+
+        actual = dict(
+            Post.objects.order_by().filter(group__isnull=False)
+            .values_list('group_id').annotate(total=Count('id'))
+        )
+        for group in Group.objects.select_for_update().only('posts_count'):
+            total = actual.get(group.pk, 0)
+            if group.posts_count != total:
+                Group.objects.filter(pk=group.pk).update(posts_count=total)
+                fixed_groups += 1
+    return fixed_authors, fixed_groups
@@ -0,0 +1,95 @@
+"""Группы и авторы по slug и username через кеш.
+
+Запись кладётся в кеш под версией ленты группы или автора (см.
+posts.cache). Версия меняется, когда пишутся посты, меняются подписки
+и сохраняется сама группа или автор, поэтому счётчики в копии не
+отстают. Несуществующие slug и username тоже кешируются, чтобы
+обходчики, которые перебирают пустые адреса, не доходили до базы, но
+под простым ключом на LOOKUP_MISS_TIMEOUT и без версии ленты: иначе
+каждый такой адрес навсегда оставлял бы в кеше свой счётчик. Когда
+группа или автор с таким именем появляются, ключ удаляется.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.http import Http404
+
+from .cache import (
+    FEED_GROUP,
+    FEED_PROFILE,
+    feed_version,
+    peek_feed_version,
+)
+from .models import Group, User
+
+
+def _missing_key(feed, key):
+    return f'lookup:missing:{feed}:{key}'
+
+
+def lookup(feed, key, load):
+    """Объект из кеша или load(); False, если его нет в базе."""
+
+    if cache.get(_missing_key(feed, key)):
+        return False
+    # Версию заводит только найденный объект: ненайденному она не нужна.
+    version = peek_feed_version(feed, key)
+    found = None
+    if version is not None:
+        found = cache.get(f'lookup:{feed}:{key}:{version}')
+    if found is None:
+        found = load()
+        if found is None:
+            cache.set(
+                _missing_key(feed, key), True, settings.LOOKUP_MISS_TIMEOUT
+            )
+            return False
+        cache.set(
+            f'lookup:{feed}:{key}:{feed_version(feed, key)}',
+            found,
+            settings.LOOKUP_CACHE_TIMEOUT,
+        )
+    # Копия из кеша ведёт себя как прочитанная в этом запросе:
+    # выборки по её связям идут туда же, куда пошла бы она сама.
+    found._state.db = router.db_for_read(type(found))
+    return found
+
+
+def forget_missing(feed, key):
+    """Группа или автор с таким именем больше не числятся ненайденными."""
+
+    cache.delete(_missing_key(feed, key))
+
+
+def find_group(slug):
+    return lookup(FEED_GROUP, slug, Group.objects.filter(slug=slug).first)
+
+
+def find_author(username):
+    """Автор с его счётчиками; пароль и прочие поля в кеш не попадают."""
+
+    return lookup(
+        FEED_PROFILE,
+        username,
+        User.objects.select_related('stats').only(
+            'username',
+            'first_name',
+            'last_name',
+            'stats__posts_count',
+            'stats__followers_count',
+        ).filter(username=username).first,
+    )
+
+
+def get_group_or_404(slug):
+    group = find_group(slug)
+    if not group:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def get_author_or_404(username):
+    author = find_author(username)
+    if not author:
+        raise Http404('Автор не найден')
+    return author
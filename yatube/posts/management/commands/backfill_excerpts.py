@@ -0,0 +1,61 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.cache import forget_feeds, touch_post
+from posts.models import Group, Post, User, make_excerpt
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет Post.excerpt, например после загрузки дампа '
+        'или смены Post.EXCERPT_LENGTH.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        posts = Post.objects.only(
+            'text', 'excerpt', 'author', 'group'
+        ).order_by('pk').iterator(chunk_size=batch_size)
+        stale = self.stale_posts(posts)
+        fixed = 0
+        touched_authors, touched_groups = set(), set()
+        while True:
+            batch = list(islice(stale, batch_size))
+            if not batch:
+                break
+            # bulk_update не шлёт сигналы, кеш постов и лент
+            # сбрасывается здесь.
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, ['excerpt'])
+            for post in batch:
+                touch_post(post.pk)
+            touched_authors.update(post.author_id for post in batch)
+            touched_groups.update(post.group_id for post in batch)
+            fixed += len(batch)
+
+        if fixed:
+            forget_feeds(
+                group_slugs=Group.objects.filter(
+                    pk__in=touched_groups
+                ).values_list('slug', flat=True),
+                usernames=User.objects.filter(
+                    pk__in=touched_authors
+                ).values_list('username', flat=True),
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено превью постов: {fixed}.'
+        ))
+
+    def stale_posts(self, posts):
+        for post in posts:
+            excerpt = make_excerpt(post.text)
+            if post.excerpt != excerpt:
+                post.excerpt = excerpt
+                yield post
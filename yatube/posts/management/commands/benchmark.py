@@ -0,0 +1,141 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from core.template_backend import production_templates, warm_up_templates
+from posts.benchmark import (
+    benchmark_caches,
+    compare_context_processors,
+    compare_feed_rows,
+    compare_results,
+    paginator_render_cost,
+    run_benchmarks,
+    seed_dataset,
+    steady_state_compiles,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95, число запросов и пик памяти страниц posts '
+        'на синтетических данных во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Замерить только эти страницы, например posts:index.',
+        )
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно baseline, доля.',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)['results']
+
+        setup_test_environment(debug=False)
+        # База и кеш свои на время замера: cache.clear() и сбросы
+        # при записи не доходят до настроенного кеша.
+        with override_settings(CACHES=benchmark_caches()):
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            cache.clear()
+            try:
+                results, context, feed_rows, pagination = self.measure(
+                    options
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:32} p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'{result["queries"]:3} запросов  '
+                f'{result["peak_memory_kb"]:9.1f} КБ'
+            )
+
+        self.stdout.write(
+            f'Год в контексте на рендер: '
+            f'{context["per_render_us"]:.3f} мкс на каждый рендер, '
+            f'{context["site_globals_us"]:.3f} мкс через site_globals'
+        )
+
+        for name, cost in feed_rows.items():
+            self.stdout.write(
+                f'Страница ленты, {name}: {cost["ms"]:.2f} мс, '
+                f'{cost["kb"]:.1f} КБ'
+            )
+        for count, (elapsed, size) in pagination.items():
+            self.stdout.write(
+                f'Пагинатор, {count} постов: {elapsed:.1f} мкс, {size} байт'
+            )
+
+        if options['output']:
+            report = {
+                'dataset': {
+                    key: options[key] for key in ('posts', 'authors', 'groups')
+                },
+                'iterations': options['iterations'],
+                'results': results,
+                'context_processors': context,
+                'pagination': pagination,
+                'feed_rows': feed_rows,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+
+        compiles = steady_state_compiles(results)
+        if compiles:
+            raise CommandError(
+                'Шаблоны компилируются после прогрева:\n' + '\n'.join(compiles)
+            )
+
+        if baseline is not None:
+            regressions = compare_results(
+                results, baseline, options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def measure(self, options):
+        dataset = seed_dataset(
+            options['posts'], options['authors'], options['groups'],
+            options['seed'],
+        )
+        # Шаблоны как в продакшене: cached.Loader и прогрев.
+        with override_settings(TEMPLATES=production_templates()):
+            warm_up_templates()
+            results = run_benchmarks(
+                dataset, options['iterations'], options['warmup'],
+                options['views'],
+            )
+            return (
+                results,
+                compare_context_processors(),
+                compare_feed_rows(),
+                paginator_render_cost(),
+            )
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.models import Post
+from posts.rows import FeedRow
+
+TEMP_SORT_MARKER = 'USE TEMP B-TREE'
+
+
+def feed_querysets():
+    """Запросы лент из index, group_posts и profile.
+
+    Ленты собираются так же, как во view, через rows(), и выбирают те
+    же поля, что FeedRowIterable. Значения фильтров не влияют на план,
+    поэтому берутся заглушки.
+    """
+
+    feeds = {
+        'posts:index': Post.objects.rows(),
+        'posts:group_list': Post.objects.filter(group_id=0).rows(),
+        'posts:profile': Post.objects.filter(author_id=0).rows(),
+    }
+    per_page = settings.PAGINATOR_POST_COUNT
+    now = timezone.now()
+    after_cursor = Q(pub_date__lt=now) | Q(pub_date=now, pk__lt=0)
+    querysets = {}
+    for view_name, queryset in feeds.items():
+        querysets[f'{view_name} (page)'] = (
+            queryset.values_list(*FeedRow.FIELDS)[:per_page]
+        )
+        querysets[f'{view_name} (cursor)'] = (
+            queryset.filter(after_cursor)
+            .values_list(*FeedRow.FIELDS)[:per_page + 1]
+        )
+    return querysets
+
+
+def explain(queryset):
+    """Вернёт строки EXPLAIN QUERY PLAN для запроса."""
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов лент: ни одна не должна '
+        'сортироваться во временном B-дереве.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(
+                f'EXPLAIN QUERY PLAN поддерживается только SQLite, '
+                f'а база — {connection.vendor}. Проверка пропущена.'
+            )
+            return
+
+        failed = []
+        for name, queryset in feed_querysets().items():
+            plan = explain(queryset)
+            self.stdout.write(f'{name}:')
+            for line in plan:
+                self.stdout.write(f'    {line}')
+            if any(TEMP_SORT_MARKER in line for line in plan):
+                failed.append(name)
+
+        if failed:
+            raise CommandError(
+                'Сортировка без индекса: ' + ', '.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('Все ленты идут по индексам.'))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.transfer import FORMATS, guess_format, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в JSON Lines или CSV, не держа их в памяти.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-', help='Файл, «-» — stdout.'
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='Через сколько постов сообщать о прогрессе.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        rows = Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug'
+        ).iterator(chunk_size=options['chunk_size'])
+        rows = self.with_progress(rows, options['progress_every'])
+        if path == '-':
+            exported = write_rows(self.stdout, fmt, rows)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                exported = write_rows(stream, fmt, rows)
+        self.stderr.write(f'Выгружено постов: {exported}.')
+
+    def with_progress(self, rows, every):
+        # Прогресс идёт в stderr, чтобы не смешиваться с выгрузкой
+        # в stdout.
+        started = time.monotonic()
+        for number, row in enumerate(rows, start=1):
+            yield row
+            if number % every == 0:
+                elapsed = time.monotonic() - started
+                rate = number / elapsed if elapsed else 0
+                self.stderr.write(f'{number} постов, {rate:.0f} в секунду')
@@ -0,0 +1,153 @@
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.cache import forget_feeds
+from posts.counters import change_author_posts, change_group_posts
+from posts.models import Group, Post, User, make_excerpt
+from posts.transfer import BadRow, FORMATS, guess_format, read_rows
+from posts.utils import POSTS_TOTAL_CACHE_KEY
+
+
+@contextmanager
+def explicit_pub_dates():
+    """bulk_create оставляет pub_date постов как есть.
+
+    pre_save поля с auto_now_add затёр бы даты из файла текущим
+    временем, поэтому на время загрузки флаг снимается. Команда
+    работает в своём процессе, и другие сохранения его не видят.
+    """
+
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из JSON Lines или CSV (поля text, pub_date, '
+        'author, group) пачками. Испорченная строка отменяет всю загрузку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами, «-» — stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--progress-every', type=int, default=100000,
+            help='Через сколько постов сообщать о прогрессе.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if options['progress_every'] < 1:
+            raise CommandError('--progress-every должен быть больше нуля.')
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        try:
+            if path == '-':
+                self.import_stream(sys.stdin.buffer, fmt, options)
+                return
+            with open(path, 'rb') as stream:
+                self.import_stream(stream, fmt, options)
+        except BadRow as error:
+            raise CommandError(f'{error} Ничего не загружено.')
+
+    def import_stream(self, stream, fmt, options):
+        # Справочники строятся один раз на запуск, а не на строку.
+        authors = dict(User.objects.values_list('username', 'id'))
+        groups = dict(Group.objects.values_list('slug', 'id'))
+        self.skipped = 0
+        imported = 0
+        touched_authors, touched_groups = set(), set()
+        started = time.monotonic()
+        posts = self.build_posts(read_rows(stream, fmt), authors, groups)
+        # Одна транзакция на всю загрузку: ошибка в середине файла
+        # не оставляет в базе половину постов.
+        with transaction.atomic(), explicit_pub_dates():
+            while True:
+                batch = list(islice(posts, options['batch_size']))
+                if not batch:
+                    break
+                self.save_batch(batch)
+                touched_authors.update(post.author_id for post in batch)
+                touched_groups.update(post.group_id for post in batch)
+                reported = imported // options['progress_every']
+                imported += len(batch)
+                if imported // options['progress_every'] > reported:
+                    self.report(imported, started)
+
+        usernames = {pk: name for name, pk in authors.items()}
+        slugs = {pk: slug for slug, pk in groups.items()}
+        forget_feeds(
+            group_slugs=[slugs[pk] for pk in touched_groups if pk],
+            usernames=[usernames[pk] for pk in touched_authors],
+        )
+        cache.delete(POSTS_TOTAL_CACHE_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {imported}, пропущено: {self.skipped}.'
+        ))
+        if imported:
+            # Вставка минует fan_out: ленты подписок собираются отдельно.
+            self.stdout.write(
+                'Ленты подписок не обновлены, запустите rebuild_timelines.'
+            )
+
+    def build_posts(self, rows, authors, groups):
+        for number, row in rows:
+            author_id = authors.get(row.get('author'))
+            group_slug = row.get('group') or None
+            group_id = groups.get(group_slug)
+            if author_id is None or (group_slug and group_id is None):
+                self.skipped += 1
+                self.stderr.write(
+                    f'Строка {number}: неизвестный автор или группа.'
+                )
+                continue
+            text = row.get('text')
+            if not isinstance(text, str) or not text:
+                raise BadRow(number, 'нет текста поста.')
+            pub_date = row.get('pub_date')
+            if pub_date:
+                try:
+                    pub_date = parse_datetime(pub_date)
+                except (TypeError, ValueError):
+                    pub_date = None
+                if pub_date is None:
+                    raise BadRow(number, 'дата не в формате ISO 8601.')
+            yield Post(
+                text=text,
+                excerpt=make_excerpt(text),
+                pub_date=pub_date or timezone.now(),
+                author_id=author_id,
+                group_id=group_id,
+            )
+
+    def save_batch(self, batch):
+        # Вставка минует сигналы, счётчики правятся на всю пачку.
+        Post.objects.bulk_create(batch)
+        for author_id, total in Counter(
+            post.author_id for post in batch
+        ).items():
+            change_author_posts(author_id, total)
+        for group_id, total in Counter(
+            post.group_id for post in batch
+        ).items():
+            change_group_posts(group_id, total)
+
+    def report(self, imported, started):
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f'{imported} постов, {rate:.0f} в секунду')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы данных.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not rebuild_search_index(connection):
+            raise CommandError(
+                f'Для базы {connection.vendor} полнотекстового индекса нет.'
+            )
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Subscription
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает ленты подписок заново, например после import_posts '
+        'или смены TIMELINE_FANOUT_LIMIT.'
+    )
+
+    def handle(self, *args, **options):
+        user_ids = Subscription.objects.order_by().values_list(
+            'user_id', flat=True
+        ).distinct()
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            with transaction.atomic():
+                rebuild_timeline(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {rebuilt}.'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_posts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп.'
+
+    def handle(self, *args, **options):
+        fixed_authors, fixed_groups = recount_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: авторов — {fixed_authors}, '
+            f'групп — {fixed_groups}.'
+        ))
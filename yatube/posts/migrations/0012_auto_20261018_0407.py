@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_posts_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    posts = Post.objects.order_by()
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=author_id, posts_count=total)
+        for author_id, total in posts.values_list('author_id')
+        .annotate(total=Count('id'))
+    )
+    for group_id, total in (
+        posts.filter(group__isnull=False).values_list('group_id')
+        .annotate(total=Count('id'))
+    ):
+        Group.objects.filter(pk=group_id).update(posts_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_auto_20261018_0406'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_posts_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import OperationalError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+                "text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite собран без FTS5: поиск останется на LIKE.
+            return
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_search_idx ON posts_post '
+            "USING gin (to_tsvector('russian', text))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS posts_post_fts_{suffix}'
+            )
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS posts_post_text_search_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20261018_0407'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
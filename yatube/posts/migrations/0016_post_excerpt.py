@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:12
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.only('text').order_by('pk')
+    batch = []
+    for post in posts.iterator():
+        post.excerpt = Truncator(post.text).chars(200)
+        batch.append(post)
+        if len(batch) == 1000:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,85 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils.text import Truncator
+
+from .rows import FeedRowIterable
 
 User = get_user_model()
 
 
+class EditConflict(Exception):
+    """Пост изменили после того, как его открыли для правки."""
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
+class AuthorStats(models.Model):
+    """Счётчики автора, которые поддерживаются при записи постов."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты в порядке ленты, который покрывают индексы модели.
+
+        Автор и группа приходят тем же запросом и только с теми
+        полями, которые выводят шаблоны лент.
+        """
+
+        return self.select_related('author', 'group').only(
+            'text',
+            'excerpt',
+            'pub_date',
+            'author',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group',
+            'group__title',
+            'group__slug',
+        ).order_by('-pub_date', '-id')
+
+    def rows(self):
+        """Лента из FeedRow: только поля, которые выводят шаблоны лент."""
+
+        queryset = self.order_by('-pub_date', '-id')
+        queryset._iterable_class = FeedRowIterable
+        return queryset
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(Post.EXCERPT_LENGTH)
+
+
 class Post(models.Model):
+    EXCERPT_LENGTH = 200
+
     text = models.TextField()
+    # Начало text для лент, админки и заголовков: страницы со списками
+    # постов не читают полный текст.
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH, blank=True, editable=False
+    )
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
         User,
@@ -28,9 +93,191 @@ class Post(models.Model):
         on_delete=models.SET_NULL,
         related_name='group_posts'
     )
+    # Растёт с каждой правкой через save_changes.
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        # excerpt пуст у несохранённых постов и у вставленных мимо save().
+        if self.excerpt:
+            return self.excerpt
+        # Отложенный text не дочитывается: в списке админки это был бы
+        # лишний запрос на каждую такую строку.
+        if 'text' in self.get_deferred_fields():
+            return f'Пост {self.pk}'
+        return make_excerpt(self.text)
+
+    # Поля, от которых зависят счётчики постов автора и группы.
+    COUNTED_FIELDS = ('author_id', 'group_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        post.remember_counted_fields()
+        return post
+
+    def remember_counted_fields(self):
+        """Запоминает автора и группу, уже учтённых в счётчиках."""
+
+        self._counted = {
+            name: self.__dict__[name]
+            for name in self.COUNTED_FIELDS
+            if name in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'text' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.text)
+            if update_fields is not None and 'text' in update_fields:
+                update_fields = kwargs['update_fields'] = {
+                    *update_fields, 'excerpt'
+                }
+        bumped = not self._state.adding
+        if bumped:
+            # Любая запись строки, в том числе из админки, поднимает
+            # версию, и save_changes замечает её.
+            self.version = models.F('version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        # Счётчики обновляются в post_save, и запись поста
+        # вместе с ними должна пройти одной транзакцией.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        if bumped:
+            # Новое значение дочитается из базы при обращении.
+            del self.__dict__['version']
+
+    def save_changes(self, fields, version):
+        """Записывает только fields, если пост всё ещё версии version.
+
+        Версия проверяется тем же UPDATE, который пишет поля; если
+        пост успели изменить, транзакция откатывается с EditConflict.
+        """
+
+        self._expected_version = version
+        try:
+            self.save(update_fields=fields)
+        except EditConflict:
+            self.version = version
+            raise
+        finally:
+            del self._expected_version
+        self.version = version + 1
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        updated = super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values,
+            update_fields, forced_update,
+        )
+        if not updated:
+            raise EditConflict
+        return updated
+
+
+class Subscription(models.Model):
+    """Подписка пользователя на автора или на группу."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='subscriptions'
+    )
+    author = models.ForeignKey(
+        User,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='subscribers'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='subscribers'
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(author__isnull=False, group__isnull=True)
+                    | models.Q(author__isnull=True, group__isnull=False)
+                ),
+                name='subscription_author_or_group',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_author_subscription',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'group'],
+                name='unique_group_subscription',
+            ),
+        ]
 
     def __str__(self):
-        return self.text
+        return f'{self.user} → {self.author or self.group}'
+
+    def save(self, *args, **kwargs):
+        # Счётчики подписчиков и лента пользователя обновляются
+        # в post_save той же транзакцией.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, разложенный при записи."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Копия Post.pub_date: страница ленты выбирается по индексу
+    # этой таблицы без соединения с постами.
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
@@ -0,0 +1,90 @@
+"""Кешированные посты для страниц одного поста.
+
+Пост читается из базы одним запросом вместе с автором, группой и
+счётчиком постов автора и кладётся в кеш под ключом из id и версии
+поста (posts.cache.post_version). Версия меняется при правке и
+удалении поста. Автор и группа сверяются с версиями их лент: смена
+имени, названия группы или числа постов автора меняет эти версии, и
+копия перечитывается. Версия заводится только у найденного поста;
+несуществующий id кешируется под простым ключом на POST_MISS_TIMEOUT,
+как ненайденные группы и авторы в posts.lookups.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .cache import (
+    FEED_GROUP,
+    FEED_PROFILE,
+    feed_version,
+    peek_post_version,
+    post_version,
+)
+from .models import Post
+
+
+def source_versions(post):
+    """Версии лент автора и группы поста."""
+
+    versions = [feed_version(FEED_PROFILE, post.author.username)]
+    if post.group_id is not None:
+        versions.append(feed_version(FEED_GROUP, post.group.slug))
+    return versions
+
+
+def _missing_key(post_id):
+    return f'post:missing:{post_id}'
+
+
+def load_post(post_id):
+    """Пост с автором, группой и счётчиком автора или None."""
+
+    if cache.get(_missing_key(post_id)):
+        return None
+    version = peek_post_version(post_id)
+    if version is not None:
+        cached = cache.get(f'post:object:{post_id}:{version}')
+        if cached is not None:
+            post, versions = cached
+            if versions == source_versions(post):
+                return post
+    else:
+        # Новая версия — момент до чтения: правка во время чтения
+        # перепишет её, и прочитанная копия в кеш не попадёт.
+        version = time.time()
+    # У автора только то, что выводит страница: пароль, почта и время
+    # входа не попадают в общий кеш.
+    post = Post.objects.select_related('author__stats', 'group').only(
+        *(field.name for field in Post._meta.concrete_fields),
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'author__stats__posts_count',
+        'group__title',
+        'group__slug',
+    ).filter(pk=post_id).first()
+    if post is None:
+        cache.set(_missing_key(post_id), True, settings.POST_MISS_TIMEOUT)
+        return None
+    if post_version(post_id, version) == version:
+        cache.set(
+            f'post:object:{post_id}:{version}',
+            (post, source_versions(post)),
+            settings.POST_CACHE_TIMEOUT,
+        )
+    return post
+
+
+def forget_missing_post(post_id):
+    """Новый пост с этим id больше не числится ненайденным."""
+
+    cache.delete(_missing_key(post_id))
+
+
+def get_post_or_404(post_id):
+    post = load_post(post_id)
+    if post is None:
+        raise Http404('Пост не найден')
+    return post
@@ -0,0 +1,108 @@
+"""Лёгкие строки лент вместо экземпляров моделей.
+
+Страница ленты выводит у поста превью текста, дату, имя автора и группу.
+FeedRow собирается из кортежа values_list с этими полями: без
+экземпляров Post, User и Group, их состояния и кеша связей. Строки
+равны друг другу по pk, но не экземплярам моделей: сверять их с
+объектами из базы нужно по pk.
+"""
+from django.db.models.query import BaseIterable, ValuesListIterable
+
+
+class Row:
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        if not isinstance(other, Row):
+            return NotImplemented
+        return type(other) is type(self) and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class AuthorRow(Row):
+    __slots__ = ('id', 'username', 'first_name', 'last_name')
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class GroupRow(Row):
+    __slots__ = ('id', 'title', 'slug')
+
+    def __init__(self, id, title, slug):
+        self.id = id
+        self.title = title
+        self.slug = slug
+
+    def __str__(self):
+        return self.title
+
+
+class FeedRow(Row):
+    __slots__ = ('id', 'excerpt', 'pub_date', 'author', 'group')
+
+    # Поля values_list в порядке, который ждёт from_values.
+    FIELDS = (
+        'id',
+        'excerpt',
+        'pub_date',
+        'author_id',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group_id',
+        'group__title',
+        'group__slug',
+    )
+
+    def __init__(self, id, excerpt, pub_date, author, group):
+        self.id = id
+        self.excerpt = excerpt
+        self.pub_date = pub_date
+        self.author = author
+        self.group = group
+
+    def __str__(self):
+        return self.excerpt
+
+    @classmethod
+    def from_values(cls, values):
+        (pk, excerpt, pub_date, author_id, username, first_name, last_name,
+         group_id, title, slug) = values
+        return cls(
+            pk,
+            excerpt,
+            pub_date,
+            AuthorRow(author_id, username, first_name, last_name),
+            None if group_id is None else GroupRow(group_id, title, slug),
+        )
+
+
+class FeedRowIterable(BaseIterable):
+    """Итерация queryset постов строками FeedRow.
+
+    Поля выбираются только при чтении: COUNT(*) того же queryset
+    обходится без JOIN автора и группы.
+    """
+
+    def __iter__(self):
+        queryset = self.queryset.values_list(*FeedRow.FIELDS)
+        for values in ValuesListIterable(
+            queryset, self.chunked_fetch, self.chunk_size
+        ):
+            yield FeedRow.from_values(values)
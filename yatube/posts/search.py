@@ -0,0 +1,108 @@
+from django.db import connections
+
+FTS_TABLE = 'posts_post_fts'
+PG_INDEX = 'posts_post_text_search_idx'
+# Словарь tsvector должен совпадать с выражением индекса в миграции.
+PG_CONFIG = 'russian'
+
+# Внешний FTS5-индекс хранит только токены, тексты остаются
+# в posts_post; триггеры держат его в согласии с таблицей.
+SQLITE_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END''',
+)
+
+_fts_tables = {}
+
+
+def has_fts_index(connection):
+    """Есть ли в SQLite-базе FTS5-индекс (сборка могла быть без FTS5)."""
+
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[connection.alias]
+
+
+def install_search_triggers(connection):
+    """Создаёт недостающие триггеры индекса.
+
+    SQLite-миграции пересоздают таблицу posts_post при добавлении
+    полей и теряют её триггеры, поэтому вызывается после каждого
+    migrate.
+    """
+
+    _fts_tables.pop(connection.alias, None)
+    if connection.vendor != 'sqlite' or not has_fts_index(connection):
+        return
+    with connection.cursor() as cursor:
+        for sql in SQLITE_TRIGGERS:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(connection):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {PG_INDEX}')
+        return True
+    if connection.vendor == 'sqlite' and has_fts_index(connection):
+        install_search_triggers(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+        return True
+    return False
+
+
+def fts_query(text):
+    """Превращает пользовательский запрос в выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 из запроса
+    не разбирались как синтаксис.
+    """
+
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in text.split()
+    )
+
+
+def search_posts(queryset, text):
+    """Посты queryset, в тексте которых есть все слова запроса."""
+
+    text = text.strip()
+    if not text:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite' and has_fts_index(connection):
+        matches = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [fts_query(text)]
+    elif connection.vendor == 'postgresql':
+        matches = (
+            f"SELECT id FROM posts_post WHERE to_tsvector('{PG_CONFIG}', "
+            f"text) @@ plainto_tsquery('{PG_CONFIG}', %s)"
+        )
+        params = [text]
+    else:
+        return queryset.filter(text__icontains=text)
+    # RawSQL в pk__in даёт IN ((SELECT ...)), а SQLite читает это
+    # как скалярный подзапрос и берёт только первую строку.
+    return queryset.extra(
+        where=[f'"posts_post"."id" IN ({matches})'], params=params
+    )
@@ -0,0 +1,219 @@
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (
+    FEED_GROUP,
+    FEED_PROFILE,
+    forget_feeds,
+    touch_feed,
+    touch_post,
+)
+from .counters import (
+    change_author_followers,
+    change_author_posts,
+    change_group_followers,
+    change_group_posts,
+)
+from .lookups import forget_missing
+from .models import Group, Post, Subscription, User
+from .objects import forget_missing_post
+from .search import install_search_triggers
+from .timeline import backfill, fan_out, is_pulled, prune, source_filter
+from .utils import POSTS_TOTAL_CACHE_KEY
+
+
+@receiver(pre_save, sender=Post)
+def load_counted_fields(sender, instance, raw, **kwargs):
+    """Достаёт из базы автора и группу, если пост их не загрузил."""
+
+    if raw or instance._state.adding:
+        return
+    counted = getattr(instance, '_counted', {})
+    if all(name in counted for name in Post.COUNTED_FIELDS):
+        return
+    stored = Post.objects.filter(pk=instance.pk).values(
+        *Post.COUNTED_FIELDS
+    ).first()
+    instance._counted = stored or {}
+
+
+def count_saved_post(instance, counted, update_fields):
+    changes = {
+        'author': change_author_posts,
+        'group': change_group_posts,
+    }
+    for field, change in changes.items():
+        attname = f'{field}_id'
+        if update_fields and not {field, attname} & update_fields:
+            continue
+        old, new = counted.get(attname), getattr(instance, attname)
+        if old != new:
+            change(old, -1)
+            change(new, 1)
+
+
+def forget_post_feeds(instance, counted):
+    """Сбрасывает кеш лент, в которых пост был или появился."""
+
+    group_ids = {counted.get('group_id'), instance.group_id} - {None}
+    author_ids = {counted.get('author_id'), instance.author_id} - {None}
+    forget_feeds(
+        group_slugs=Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True) if group_ids else (),
+        usernames=User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True),
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, update_fields, **kwargs):
+    if raw:
+        return
+    counted = {} if created else instance._counted
+    count_saved_post(instance, counted, update_fields)
+    forget_post_feeds(instance, counted)
+    if created:
+        forget_missing_post(instance.pk)
+    else:
+        touch_post(instance.pk)
+    if created or any(
+        counted.get(name) != getattr(instance, name)
+        for name in Post.COUNTED_FIELDS
+    ):
+        fan_out(instance, created)
+    if created:
+        cache.delete(POSTS_TOTAL_CACHE_KEY)
+    instance.remember_counted_fields()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_posts(instance.author_id, -1)
+    change_group_posts(instance.group_id, -1)
+    forget_post_feeds(instance, {})
+    touch_post(instance.pk)
+    cache.delete(POSTS_TOTAL_CACHE_KEY)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, raw=False, created=False, **kwargs):
+    """Название группы выводится в её ленте и на главной."""
+
+    if raw or created:
+        return
+    forget_feeds(group_slugs=[instance.slug])
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, raw, created, update_fields, **kwargs):
+    """Имя автора выводится в лентах всех групп, где он писал."""
+
+    if raw or created or update_fields == {'last_login'}:
+        return
+    forget_feeds(
+        group_slugs=Group.objects.filter(
+            group_posts__author=instance
+        ).distinct().values_list('slug', flat=True),
+        usernames=[instance.username],
+    )
+
+
+# Лента и поле, по которым группы и авторы ищутся в posts.lookups.
+LOOKUP_FIELDS = {
+    Group: (FEED_GROUP, 'slug'),
+    User: (FEED_PROFILE, 'username'),
+}
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def forget_renamed_source(sender, instance, raw, update_fields, **kwargs):
+    """Прежние slug и username перестают находиться сразу после смены."""
+
+    if raw or instance._state.adding or update_fields == {'last_login'}:
+        return
+    feed, field = LOOKUP_FIELDS[sender]
+    old = sender.objects.filter(pk=instance.pk).values_list(
+        field, flat=True
+    ).first()
+    if old is not None and old != getattr(instance, field):
+        touch_feed(feed, old)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def forget_missing_source(sender, instance, raw, update_fields, **kwargs):
+    """Новые или переименованные группа и автор находятся сразу."""
+
+    if raw or update_fields == {'last_login'}:
+        return
+    feed, field = LOOKUP_FIELDS[sender]
+    forget_missing(feed, getattr(instance, field))
+
+
+@receiver(post_delete, sender=User)
+def author_deleted(sender, instance, **kwargs):
+    touch_feed(FEED_PROFILE, instance.username)
+
+
+def forget_source_feeds(subscription):
+    """Кнопка подписки выводится на странице автора или группы."""
+
+    if subscription.group_id is not None:
+        forget_feeds(
+            group_slugs=Group.objects.filter(
+                pk=subscription.group_id
+            ).values_list('slug', flat=True),
+            index=False,
+        )
+    else:
+        forget_feeds(
+            usernames=User.objects.filter(
+                pk=subscription.author_id
+            ).values_list('username', flat=True),
+            index=False,
+        )
+
+
+def change_followers(subscription, delta):
+    change_author_followers(subscription.author_id, delta)
+    change_group_followers(subscription.group_id, delta)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, raw, **kwargs):
+    if raw or not created:
+        return
+    change_followers(instance, 1)
+    forget_source_feeds(instance)
+    if not is_pulled(instance.author_id, instance.group_id):
+        backfill([instance.user_id], instance.author_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    source = (instance.author_id, instance.group_id)
+    was_pulled = is_pulled(*source)
+    change_followers(instance, -1)
+    forget_source_feeds(instance)
+    prune(instance.user_id, *source)
+    if was_pulled and not is_pulled(*source):
+        # Источник снова раскладывается при записи: его посты, которые
+        # раньше брались при чтении, нужно положить в ленты.
+        backfill(
+            Subscription.objects.filter(
+                source_filter(*source)
+            ).values_list('user_id', flat=True),
+            *source,
+        )
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    """Возвращает триггеры поискового индекса после migrate."""
+
+    install_search_triggers(connections[using])
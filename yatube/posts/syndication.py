@@ -0,0 +1,180 @@
+"""Atom, RSS и JSON Feed для главной, групп и авторов.
+
+Тело ленты отдаётся кусками по мере чтения постов из базы. Куски
+заодно складываются в кеш под версией ленты (см. posts.cache), так что
+до следующей записи в ленту база не трогается вовсе.
+"""
+import json
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import feed_version
+
+JSON_FEED_VERSION = 'https://jsonfeed.org/version/1.1'
+CONTENT_TYPES = {
+    'atom': 'application/atom+xml; charset=utf-8',
+    'rss': 'application/rss+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+FORMATS = tuple(CONTENT_TYPES)
+
+
+class StreamingAtomFeed(Atom1Feed):
+    def latest_post_date(self):
+        return self.feed['updated']
+
+
+class StreamingRssFeed(Rss201rev2Feed):
+    def latest_post_date(self):
+        return self.feed['updated']
+
+
+def post_item(request, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.pk])
+    )
+    return {
+        'title': post.excerpt[:30],
+        'link': link,
+        'description': post.text,
+        'author_name': post.author.get_full_name() or post.author.username,
+        'author_link': request.build_absolute_uri(
+            reverse('posts:profile', args=[post.author.username])
+        ),
+        'pubdate': post.pub_date,
+        'unique_id': link,
+        'categories': [post.group.title] if post.group_id else None,
+    }
+
+
+def stream_xml(feed, items):
+    """Отдаёт XML ленты кусками: шапка, затем по записи на кусок."""
+
+    buffer = StringIO()
+    handler = SimplerXMLGenerator(buffer, 'utf-8')
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    handler.startDocument()
+    if isinstance(feed, Atom1Feed):
+        outer, element = ['feed'], 'entry'
+        handler.startElement('feed', feed.root_attributes())
+    else:
+        outer, element = ['channel', 'rss'], 'item'
+        handler.startElement('rss', feed.rss_attributes())
+        handler.startElement('channel', feed.root_attributes())
+    feed.add_root_elements(handler)
+    yield flush()
+    for item in items:
+        # add_item приводит поля записи к виду, который ждут
+        # add_item_elements; копить записи в ленте не нужно.
+        feed.add_item(**item)
+        item = feed.items.pop()
+        handler.startElement(element, feed.item_attributes(item))
+        feed.add_item_elements(handler, item)
+        handler.endElement(element)
+        yield flush()
+    for name in outer:
+        handler.endElement(name)
+    yield flush()
+
+
+def stream_json(meta, items):
+    """JSON Feed 1.1 кусками: шапка, затем по записи на кусок."""
+
+    header = {
+        'version': JSON_FEED_VERSION,
+        'title': meta['title'],
+        'home_page_url': meta['link'],
+        'feed_url': meta['feed_url'],
+        'description': meta['description'],
+    }
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "items": ['
+    separator = ''
+    for item in items:
+        entry = {
+            'id': item['unique_id'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_text': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+            'authors': [{
+                'name': item['author_name'],
+                'url': item['author_link'],
+            }],
+        }
+        if item['categories']:
+            entry['tags'] = item['categories']
+        yield separator + json.dumps(entry, ensure_ascii=False)
+        separator = ', '
+    yield ']}'
+
+
+def generate(request, fmt, meta, posts):
+    items = (
+        post_item(request, post)
+        for post in posts[:settings.SYNDICATION_ITEMS].iterator()
+    )
+    if fmt == 'json':
+        return stream_json(meta, items)
+    feed_class = StreamingAtomFeed if fmt == 'atom' else StreamingRssFeed
+    feed = feed_class(
+        title=meta['title'],
+        link=meta['link'],
+        description=meta['description'],
+        feed_url=meta['feed_url'],
+        language=settings.LANGUAGE_CODE,
+        updated=meta['updated'],
+    )
+    return stream_xml(feed, items)
+
+
+def caching(chunks, key):
+    """Пропускает куски дальше и кладёт их в кеш, если дошли до конца."""
+
+    stored = []
+    for chunk in chunks:
+        stored.append(chunk)
+        yield chunk
+    cache.set(key, stored, settings.FEED_CACHE_TIMEOUT)
+
+
+def feed_response(request, fmt, feed, key, load):
+    """Потоковый ответ с лентой feed/key в формате fmt.
+
+    load() вызывается только при промахе кеша и возвращает описание
+    ленты и queryset её постов.
+    """
+
+    if fmt not in FORMATS:
+        raise Http404('Неизвестный формат ленты')
+    version = feed_version(feed, key)
+    # Ссылки в ленте абсолютные, поэтому схема и хост входят в ключ.
+    # Строка запроса в ленту не попадает и в ключе не нужна.
+    cache_key = (
+        f'feed:syndication:{request.scheme}://{request.get_host()}:'
+        f'{fmt}:{feed}:{key}:{version}'
+    )
+    chunks = cache.get(cache_key)
+    if chunks is None:
+        title, link, description, posts = load()
+        meta = {
+            'title': title,
+            'link': request.build_absolute_uri(link),
+            'description': description,
+            'feed_url': request.build_absolute_uri(request.path),
+            'updated': datetime.fromtimestamp(version, timezone.utc),
+        }
+        chunks = caching(generate(request, fmt, meta, posts), cache_key)
+    return StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
@@ -0,0 +1,70 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from posts.cache import fragment_key, record_fragment
+from posts.utils import decode_cursor
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, feed, key, page_obj):
+        self.nodelist = nodelist
+        self.feed = feed
+        self.key = key
+        self.page_obj = page_obj
+
+    def page_token(self, context):
+        page_obj = self.page_obj.resolve(context)
+        if getattr(page_obj, 'is_cursor', False):
+            # В ключ идёт разобранная позиция, а не сырой ?cursor=:
+            # испорченный токен даёт первую страницу, а длина ключа
+            # не зависит от запроса.
+            token = context['request'].GET.get('cursor')
+            cursor = decode_cursor(token) if token else None
+            if cursor is None:
+                return 1
+            direction, pub_date, pk = cursor
+            return f'cursor:{direction}:{pub_date.timestamp()}:{pk}'
+        return page_obj.number
+
+    def render(self, context):
+        cache_key = fragment_key(
+            self.feed.resolve(context),
+            self.key.resolve(context),
+            self.page_token(context),
+        )
+        rendered = []
+
+        def render():
+            rendered.append(True)
+            return self.nodelist.render(context)
+
+        # get_or_set: при одновременных промахах страницу отрисует
+        # один запрос, остальные дождутся его результата.
+        fragment = cache.get_or_set(
+            cache_key, render, settings.FEED_CACHE_TIMEOUT
+        )
+        record_fragment(hit=not rendered)
+        return fragment
+
+
+@register.tag
+def feed_cache(parser, token):
+    """Кеширует отрисованную страницу ленты.
+
+        {% feed_cache 'group' group.slug page_obj %}
+            ...
+        {% endfeed_cache %}
+    """
+
+    bits = token.split_contents()
+    if len(bits) != 4:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает ленту, её ключ и page_obj.'
+        )
+    nodelist = parser.parse(('endfeed_cache',))
+    parser.delete_first_token()
+    feed, key, page_obj = (parser.compile_filter(bit) for bit in bits[1:])
+    return FeedCacheNode(nodelist, feed, key, page_obj)
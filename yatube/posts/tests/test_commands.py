@@ -0,0 +1,274 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from ..benchmark import (
+    benchmark_caches,
+    compare_context_processors,
+    compare_feed_rows,
+    compare_results,
+    paginator_render_cost,
+    run_benchmarks,
+    seed_dataset,
+)
+from ..models import AuthorStats, Group, Post, Subscription, TimelineEntry
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class CheckQueryPlansCommandTest(TestCase):
+    def test_feeds_use_indexes(self):
+        """Запросы лент не сортируются во временном B-дереве."""
+
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('TEMP B-TREE', out.getvalue())
+
+
+class RecountPostsCommandTest(TestCase):
+    def test_recount_repairs_drift(self):
+        """recount_posts чинит разошедшиеся счётчики."""
+
+        user = User.objects.create_user(username='auth')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(author=user, group=group, text=f'Текст {i}')
+            for i in range(3)
+        )
+        call_command('recount_posts', stdout=StringIO())
+        group.refresh_from_db()
+        self.assertEqual(group.posts_count, 3)
+        self.assertEqual(AuthorStats.objects.get(author=user).posts_count, 3)
+
+
+class RebuildTimelinesCommandTest(TestCase):
+    def test_rebuild_picks_up_bulk_created_posts(self):
+        """rebuild_timelines раскладывает посты, минуя сигналы."""
+
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Subscription.objects.create(user=reader, author=author)
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Текст {i}') for i in range(3)
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 3)
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    def test_rebuild_indexes_existing_posts(self):
+        """После перестройки индекс находит уже записанные посты."""
+
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Редкое слово')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            list(search_posts(Post.objects.all(), 'редкое')), [post]
+        )
+
+
+class BackfillExcerptsCommandTest(TestCase):
+    def test_backfill_fills_bulk_created_posts(self):
+        """backfill_excerpts заполняет превью постов, минуя save."""
+
+        user = User.objects.create_user(username='auth')
+        long_text = 'слово ' * 100
+        Post.objects.bulk_create([
+            Post(author=user, text='Короткий пост'),
+            Post(author=user, text=long_text),
+        ])
+        out = StringIO()
+        call_command('backfill_excerpts', batch_size=1, stdout=out)
+        self.assertIn('2', out.getvalue())
+        short, long = Post.objects.order_by('pk')
+        self.assertEqual(short.excerpt, 'Короткий пост')
+        self.assertEqual(len(long.excerpt), Post.EXCERPT_LENGTH)
+        self.assertTrue(long_text.startswith(long.excerpt[:-1]))
+
+
+class ImportExportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def test_export_import_round_trip(self):
+        """Выгрузка и загрузка сохраняют посты, даты и счётчики."""
+
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                Post.objects.all().delete()
+                Post.objects.create(author=self.user, text='Первый')
+                Post.objects.create(
+                    author=self.user, text='Второй, "в группе"',
+                    group=self.group,
+                )
+                expected = list(Post.objects.order_by('pk').values_list(
+                    'text', 'pub_date', 'author_id', 'group_id'
+                ))
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, f'posts.{fmt}')
+                    call_command(
+                        'export_posts', path, stderr=StringIO()
+                    )
+                    Post.objects.all().delete()
+                    call_command(
+                        'import_posts', path, batch_size=1,
+                        stdout=StringIO(), stderr=StringIO(),
+                    )
+                imported = list(Post.objects.order_by('pk').values_list(
+                    'text', 'pub_date', 'author_id', 'group_id'
+                ))
+                self.assertEqual(imported, expected)
+                self.group.refresh_from_db()
+                self.assertEqual(self.group.posts_count, 1)
+                self.assertEqual(
+                    AuthorStats.objects.get(author=self.user).posts_count, 2
+                )
+
+    def test_import_skips_unknown_authors(self):
+        """Строки с неизвестным автором пропускаются."""
+
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8'
+        ) as stream:
+            stream.write('{"text": "Чужой", "author": "nobody"}\n')
+            stream.write('{"text": "Свой", "author": "auth"}\n')
+            stream.flush()
+            out = StringIO()
+            call_command(
+                'import_posts', stream.name, stdout=out, stderr=StringIO()
+            )
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Свой']
+        )
+        self.assertIn('пропущено: 1', out.getvalue())
+        self.assertIn('rebuild_timelines', out.getvalue())
+
+    def test_broken_rows_abort_import(self):
+        """Испорченная строка отменяет загрузку и называет свой номер."""
+
+        cases = {
+            'не JSON': '{"text": "Свой", "author": "auth"',
+            'без текста': '{"author": "auth"}',
+            'плохая дата': '{"text": "Т", "author": "auth", "pub_date": "x"}',
+        }
+        for name, broken in cases.items():
+            with self.subTest(name), tempfile.NamedTemporaryFile(
+                'w', suffix='.jsonl', encoding='utf-8'
+            ) as stream:
+                stream.write('{"text": "Свой", "author": "auth"}\n\n')
+                stream.write(broken + '\n')
+                stream.flush()
+                with self.assertRaisesMessage(CommandError, 'Строка 3'):
+                    call_command(
+                        'import_posts', stream.name, batch_size=1,
+                        stdout=StringIO(), stderr=StringIO(),
+                    )
+            self.assertFalse(Post.objects.exists())
+            self.assertFalse(
+                AuthorStats.objects.filter(posts_count__gt=0).exists()
+            )
+
+    def test_non_utf8_file_aborts_import(self):
+        """Файл не в UTF-8 даёт ошибку команды с номером строки."""
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as stream:
+            stream.write('text,author\nСвой,auth\n'.encode())
+            stream.write('Чужой,auth\n'.encode('cp1251'))
+            stream.flush()
+            with self.assertRaisesMessage(CommandError, 'Строка 3'):
+                call_command(
+                    'import_posts', stream.name,
+                    stdout=StringIO(), stderr=StringIO(),
+                )
+        self.assertFalse(Post.objects.exists())
+
+    def test_import_reports_progress(self):
+        """Прогресс печатается раз в --progress-every постов."""
+
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8'
+        ) as stream:
+            for number in range(5):
+                stream.write(
+                    f'{{"text": "Пост {number}", "author": "auth"}}\n'
+                )
+            stream.flush()
+            out = StringIO()
+            call_command(
+                'import_posts', stream.name, batch_size=3,
+                progress_every=2, stdout=out, stderr=StringIO(),
+            )
+        self.assertEqual(out.getvalue().count('в секунду'), 2)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_benchmark_cache_is_isolated(self):
+        """Кеш бенчмарка не задевает настроенный кеш."""
+
+        cache.set('benchmark:sentinel', 1)
+        with override_settings(CACHES=benchmark_caches()):
+            cache.clear()
+            cache.set('benchmark:inside', 1)
+        self.assertEqual(cache.get('benchmark:sentinel'), 1)
+        self.assertIsNone(cache.get('benchmark:inside'))
+
+    def test_benchmark_covers_posts_urls(self):
+        """Замер проходит по всем страницам posts и считает запросы."""
+
+        dataset = seed_dataset(posts=30, authors=3, groups=2, seed=1)
+        results = run_benchmarks(dataset, iterations=2, warmup=0)
+        self.assertIn('posts:index', results)
+        self.assertIn('posts:post_create (POST)', results)
+        self.assertEqual(results['posts:post_detail']['status'], 200)
+        self.assertGreater(results['posts:group_list']['queries'], 0)
+
+    def test_compare_results_flags_regressions(self):
+        """Рост p95 сверх порога и лишние запросы — регрессии."""
+
+        baseline = {'posts:index': {'p95_ms': 10.0, 'queries': 2}}
+        self.assertEqual(compare_results(
+            {'posts:index': {'p95_ms': 11.0, 'queries': 2}}, baseline, 0.2
+        ), [])
+        regressions = compare_results(
+            {'posts:index': {'p95_ms': 13.0, 'queries': 3}}, baseline, 0.2
+        )
+        self.assertEqual(len(regressions), 2)
+
+    def test_paginator_markup_does_not_grow(self):
+        """Разметка пагинатора не растёт с числом постов."""
+
+        results = paginator_render_cost((1000, 10 ** 7), iterations=1)
+        sizes = [size for _, size in results.values()]
+        # Растёт только число цифр в номерах страниц.
+        self.assertLess(max(sizes) - min(sizes), 200)
+
+    def test_context_processors_compared(self):
+        """Сравнение отдаёт цену года на рендер для обоих процессоров."""
+
+        results = compare_context_processors(iterations=100)
+        self.assertEqual(
+            set(results), {'per_render_us', 'site_globals_us'}
+        )
+        for cost in results.values():
+            self.assertGreaterEqual(cost, 0)
+
+    def test_feed_rows_lighter_than_models(self):
+        """Страница ленты из FeedRow занимает меньше памяти, чем модели."""
+
+        seed_dataset(posts=30, authors=3, groups=2, seed=1)
+        results = compare_feed_rows(iterations=1)
+        self.assertLess(results['rows']['kb'], results['models']['kb'])
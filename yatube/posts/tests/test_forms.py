@@ -1,4 +1,7 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -16,6 +19,10 @@ class PostFormTests(TestCase):
             title='Тестовая группа',
             slug='test_group'
         )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group'
+        )
         cls.post = Post.objects.create(
             author=cls.user,
             text='Тестовый текст',
@@ -23,6 +30,7 @@ class PostFormTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -72,3 +80,124 @@ class PostFormTests(TestCase):
                 group=form_data['group'],
             ).exists()
         )
+
+    def test_edit_post_moves_group_counters(self):
+        """Перенос поста в другую группу обновляет счётчики групп."""
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': self.post.text, 'group': self.other_group.id},
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+
+class PostEditPathTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый текст', group=self.group
+        )
+        self.url = reverse('posts:post_edit', args=[self.post.pk])
+        self.client.force_login(self.user)
+        # Пост уже в кеше, как после просмотра его страницы.
+        self.client.get(reverse('posts:post_detail', args=[self.post.pk]))
+
+    def post_queries(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        return response, [
+            query['sql'] for query in queries if 'posts_' in query['sql']
+        ]
+
+    def test_denied_edit_skips_post_queries(self):
+        """Чужой пост: ни формы, ни запросов к постам и группам."""
+
+        self.client.force_login(self.other)
+        response, queries = self.post_queries(
+            {'text': 'Чужой текст', 'version': self.post.version}
+        )
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(queries, [])
+
+    def test_unchanged_form_writes_nothing(self):
+        _, queries = self.post_queries({
+            'text': self.post.text,
+            'group': self.group.pk,
+            'version': self.post.version,
+        })
+        self.assertFalse([sql for sql in queries if 'UPDATE' in sql])
+
+    def test_edit_updates_changed_fields_only(self):
+        """Правка текста обновляет только текст и версию."""
+
+        _, queries = self.post_queries({
+            'text': 'Новый текст',
+            'group': self.group.pk,
+            'version': self.post.version,
+        })
+        updates = [sql for sql in queries if 'UPDATE "posts_post"' in sql]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"text"', updates[0])
+        self.assertIn('"version"', updates[0])
+        self.assertNotIn('"group_id"', updates[0])
+        self.assertNotIn('"pub_date"', updates[0])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый текст')
+        self.assertEqual(self.post.version, 1)
+
+    def test_stale_version_conflict(self):
+        """Правка поверх чужой не проходит и показывает ошибку."""
+
+        self.post.text = 'Правка из другой вкладки'
+        self.post.save_changes(['text'], self.post.version)
+        response = self.client.post(self.url, {
+            'text': 'Моя правка',
+            'group': self.group.pk,
+            'version': 0,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.assertEqual(response.context['version'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Правка из другой вкладки')
+
+    def test_admin_save_bumps_version(self):
+        """Правка в админке между открытием формы и отправкой не теряется."""
+
+        version = self.client.get(self.url).context['version']
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'admin'
+        )
+        admin_client = Client()
+        admin_client.force_login(admin)
+        admin_client.post(
+            reverse('admin:posts_post_change', args=[self.post.pk]),
+            {
+                'text': 'Правка модератора',
+                'author': self.user.pk,
+                'group': self.group.pk,
+            },
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, version + 1)
+
+        response = self.client.post(self.url, {
+            'text': 'Моя правка',
+            'group': self.group.pk,
+            'version': version,
+        })
+        self.assertTrue(response.context['form'].non_field_errors())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Правка модератора')
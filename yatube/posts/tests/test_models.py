@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Group, Post
+from ..models import AuthorStats, Group, Post, Subscription, TimelineEntry
 
 User = get_user_model()
 
@@ -31,3 +33,190 @@ class PostModelTest(TestCase):
         test_post = PostModelTest.post
         expected_post = test_post.text
         self.assertEqual(expected_post, str(test_post))
+
+
+class FeedRowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def test_rows_carry_feed_fields(self):
+        """Строки ленты несут то, что выводят шаблоны."""
+
+        with self.assertNumQueries(1):
+            rows = list(Post.objects.rows())
+        without_group, row = rows
+        self.assertIsNone(without_group.group)
+        self.assertEqual(row.pk, self.post.pk)
+        self.assertEqual(row.author.pk, self.user.pk)
+        self.assertEqual(row.group.pk, self.group.pk)
+        self.assertNotEqual(row, self.post)
+        self.assertEqual(row, rows[1])
+        self.assertNotEqual(row.group, row.author)
+        self.assertEqual(row.author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(str(row.group), self.group.title)
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def test_count_skips_joins(self):
+        """COUNT(*) ленты строк не присоединяет авторов и группы."""
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Post.objects.rows().count(), 2)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+
+class PostExcerptTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_excerpt_follows_text(self):
+        """excerpt пересчитывается при сохранении и правке текста."""
+
+        post = Post.objects.create(author=self.user, text='Начало')
+        self.assertEqual(post.excerpt, 'Начало')
+        post.text = 'длинно ' * 100
+        post.save_changes(['text'], post.version)
+        post.refresh_from_db()
+        self.assertEqual(len(post.excerpt), Post.EXCERPT_LENGTH)
+        self.assertTrue(post.text.startswith(post.excerpt[:-1]))
+
+    def test_lists_skip_full_text(self):
+        """Строки лент и заголовки не читают колонку text."""
+
+        Post.objects.create(author=self.user, text='Текст')
+        with CaptureQueriesContext(connection) as queries:
+            row, = Post.objects.rows()
+        self.assertNotIn('"posts_post"."text"', queries[0]['sql'])
+        self.assertEqual(str(row), 'Текст')
+        post = Post.objects.defer('text').get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(post), 'Текст')
+
+    def test_str_without_stored_excerpt(self):
+        """Пост без сохранённого excerpt выводится по началу текста."""
+
+        text = 'длинно ' * 100
+        unsaved = Post(author=self.user, text=text)
+        inserted, = Post.objects.bulk_create(
+            [Post(author=self.user, text=text)]
+        )
+        for name, post in (('unsaved', unsaved), ('bulk', inserted)):
+            with self.subTest(post=name):
+                self.assertEqual(len(str(post)), Post.EXCERPT_LENGTH)
+                self.assertTrue(text.startswith(str(post)[:-1]))
+
+    def test_str_does_not_load_deferred_text(self):
+        """Без excerpt и с отложенным text пост не дочитывает текст."""
+
+        Post.objects.bulk_create([Post(author=self.user, text='Текст')])
+        post = Post.objects.defer('text').get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(post), f'Пост {post.pk}')
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Первая', slug='first')
+        cls.other_group = Group.objects.create(title='Вторая', slug='second')
+
+    def assertCounters(self, author, group, other_group):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(AuthorStats.objects.get(author=self.user).posts_count,
+                         author)
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.other_group.posts_count, other_group)
+
+    def test_counters_follow_post_writes(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group
+        )
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertCounters(2, 1, 0)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def timeline(self):
+        return set(
+            TimelineEntry.objects.filter(user=self.reader)
+            .values_list('post_id', flat=True)
+        )
+
+    def test_post_fans_out_to_subscribers(self):
+        """Новый пост попадает в ленты подписчиков автора и группы."""
+
+        Subscription.objects.create(user=self.reader, group=self.group)
+        in_group = Post.objects.create(
+            author=self.author, group=self.group, text='В группе'
+        )
+        outside = Post.objects.create(author=self.author, text='Вне группы')
+        self.assertEqual(self.timeline(), {in_group.pk})
+        self.assertEqual(self.group.subscribers.count(), 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.followers_count, 1)
+
+        in_group.group = self.other_group
+        in_group.save()
+        self.assertEqual(self.timeline(), set())
+
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), {in_group.pk, outside.pk})
+
+    def test_unsubscribe_keeps_posts_of_other_subscriptions(self):
+        """Отписка убирает только посты, не покрытые другими подписками."""
+
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Subscription.objects.create(user=self.reader, group=self.group)
+        Subscription.objects.filter(
+            user=self.reader, author=self.author
+        ).delete()
+        self.assertEqual(self.timeline(), {post.pk})
+        Subscription.objects.filter(
+            user=self.reader, group=self.group
+        ).delete()
+        self.assertEqual(self.timeline(), set())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_not_fanned_out(self):
+        """Посты авторов с большим числом подписчиков не раскладываются."""
+
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(self.timeline(), set())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1
+        )
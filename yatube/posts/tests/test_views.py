@@ -1,10 +1,19 @@
+import json
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from ..models import Post, Group
+from core.testing import max_queries
+from ..cache import fragment_cache_stats, reset_fragment_cache_stats
+from ..models import Post, Group, Subscription
+from ..utils import WindowPaginator
 
 User = get_user_model()
 
@@ -49,9 +58,9 @@ class PostPagesTests(TestCase):
 
     def post_checking(self, post):
         self.assertEqual(post.pk, self.post.pk)
-        self.assertEqual(post.text, self.post.text)
-        self.assertEqual(post.author, self.post.author)
-        self.assertEqual(post.group, self.post.group)
+        self.assertEqual(post.excerpt, self.post.text)
+        self.assertEqual(post.author.pk, self.post.author.pk)
+        self.assertEqual(post.group.pk, self.post.group.pk)
 
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -118,7 +127,8 @@ class PostPagesTests(TestCase):
             with self.subTest(page=page):
                 response = self.authorized_client.get(page)
                 self.assertIn(
-                    post, response.context['page_obj']
+                    post.pk,
+                    [row.pk for row in response.context['page_obj']],
                 )
 
     def test_post_new_not_in_group(self):
@@ -127,7 +137,7 @@ class PostPagesTests(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         post = response.context['page_obj'][0]
         group = post.group
-        self.assertEqual(group, self.group)
+        self.assertEqual(group.pk, self.group.pk)
 
 
 class PaginatorViewsTest(TestCase):
@@ -149,6 +159,9 @@ class PaginatorViewsTest(TestCase):
         ])
 
     def setUp(self):
+        # bulk_create не шлёт сигналы, закешированное число постов
+        # могло остаться от предыдущих тестов.
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -176,3 +189,743 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(requested_page=requested_page):
                 response = self.authorized_client.get(requested_page)
                 self.assertEqual(len(response.context['page_obj']), page_len)
+
+
+@override_settings(PAGINATOR_ON_ENDS=2, PAGINATOR_ON_EACH_SIDE=3)
+class WindowPaginatorTest(SimpleTestCase):
+    def page_range(self, number, pages=50):
+        paginator = WindowPaginator(range(pages * 10), 10)
+        return paginator.get_page(number).elided_page_range
+
+    def test_short_range_is_not_elided(self):
+        self.assertEqual(self.page_range(1, pages=10), list(range(1, 11)))
+
+    def test_window_around_current_page(self):
+        """Края и окно вокруг текущей страницы, пропуски — многоточие."""
+
+        dots = WindowPaginator.ELLIPSIS
+        self.assertEqual(
+            self.page_range(25),
+            [1, 2, dots, 22, 23, 24, 25, 26, 27, 28, dots, 49, 50],
+        )
+        self.assertEqual(
+            self.page_range(1), [1, 2, 3, 4, dots, 49, 50]
+        )
+        self.assertEqual(
+            self.page_range(50), [1, 2, dots, 47, 48, 49, 50]
+        )
+
+    def test_template_renders_window(self):
+        paginator = WindowPaginator(range(10 ** 6), 10)
+        html = render_to_string('includes/paginator.html', {
+            'page_obj': paginator.get_page(500), 'page_query': '',
+        })
+        self.assertIn('page=100000', html)
+        self.assertIn('page=503', html)
+        self.assertNotIn('page=504"', html)
+        self.assertIn('…', html)
+
+
+@override_settings(PAGINATOR_CURSOR_MODE=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="some_user")
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+        )
+        Post.objects.bulk_create([
+            Post(
+                text=f'Тестовый текст {i}',
+                author=cls.user,
+                group=cls.group,
+            )
+            for i in range(13)
+        ])
+
+    def test_cursor_pages(self):
+        """Курсор ведёт вперёд и назад по ленте без пропусков."""
+
+        len_page = settings.PAGINATOR_POST_COUNT
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                self.assertEqual(
+                    [post.pk for post in first], expected[:len_page]
+                )
+
+                second = self.client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertFalse(second.has_next())
+                self.assertTrue(second.has_previous())
+                self.assertEqual(
+                    [post.pk for post in second], expected[len_page:]
+                )
+
+                back = self.client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertFalse(back.has_previous())
+                self.assertEqual(
+                    [post.pk for post in back], expected[:len_page]
+                )
+
+    def test_cursor_fragments_follow_writes(self):
+        """Фрагменты курсора кешируются по позиции и сбрасываются записью."""
+
+        cache.clear()
+        reset_fragment_cache_stats()
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        self.client.get(url, {'cursor': 'не-курсор' * 50})
+        self.assertEqual(fragment_cache_stats(), {'hits': 1, 'misses': 1})
+
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}
+        ).context['page_obj']
+        post = Post.objects.get(pk=second[0].pk)
+        post.text = 'Правка на второй странице'
+        post.save()
+        response = self.client.get(url, {'cursor': first.next_cursor})
+        self.assertContains(response, 'Правка на второй странице')
+
+    def test_cursor_page_skips_count(self):
+        """В режиме курсора лента не выполняет COUNT(*)."""
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+
+        response = self.client.get(reverse('posts:index'), {'cursor': '@@'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.PAGINATOR_POST_COUNT
+        )
+
+
+class FeedQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="some_user")
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+        )
+        for i in range(settings.PAGINATOR_POST_COUNT):
+            author = User.objects.create_user(username=f'author_{i}')
+            group = Group.objects.create(title=f'Группа {i}', slug=f'g_{i}')
+            Post.objects.create(text=f'Текст {i}', author=author, group=group)
+            Post.objects.create(text=f'Текст {i}', author=cls.user,
+                                group=cls.group)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+
+        budgets = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile', kwargs={'username': self.user}): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url), max_queries(budget):
+                self.client.get(url).content
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="some_user")
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, sum('COUNT(' in query['sql'] for query in queries)
+
+    def test_index_count_is_cached(self):
+        """Главная берёт число постов из кеша и сбрасывает его при записи."""
+
+        Post.objects.create(author=self.user, text='Первый')
+        response, counts = self.count_queries(reverse('posts:index'))
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+        response, counts = self.count_queries(reverse('posts:index'))
+        self.assertEqual(counts, 0)
+
+        Post.objects.create(author=self.user, text='Второй')
+        response, counts = self.count_queries(reverse('posts:index'))
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+
+class FeedFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="some_user")
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        reset_fragment_cache_stats()
+        self.group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+
+    def test_repeated_page_is_served_from_cache(self):
+        """Повторный запрос ленты не выбирает посты из базы."""
+
+        self.client.get(self.group_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.group_url)
+        self.assertContains(response, self.post.text)
+        self.assertFalse(
+            any('"posts_post"."text"' in query['sql'] for query in queries)
+        )
+        self.assertEqual(fragment_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_write_evicts_only_affected_feeds(self):
+        """Пост в другой группе не сбрасывает кеш этой группы."""
+
+        index_url = reverse('posts:index')
+        self.client.get(self.group_url)
+        self.client.get(index_url)
+        other = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.other_group
+        )
+        self.assertNotContains(self.client.get(self.group_url), other.text)
+        self.assertContains(self.client.get(index_url), other.text)
+        self.assertEqual(fragment_cache_stats(), {'hits': 1, 'misses': 3})
+
+        Post.objects.create(
+            author=self.user, text='Пост в группе', group=self.group
+        )
+        self.assertContains(self.client.get(self.group_url), 'Пост в группе')
+
+    def test_other_process_touch_is_seen_at_once(self):
+        """Сброс ленты в другом процессе виден сразу, а не через L1."""
+
+        self.client.get(self.group_url)
+        # Так touch_feed другого процесса выглядит отсюда: новая версия в L2.
+        caches[settings.VERSION_CACHE].set(
+            f'feed:version:group:{self.group.slug}', 1.0, None
+        )
+        self.client.get(self.group_url)
+        self.assertEqual(fragment_cache_stats(), {'hits': 0, 'misses': 2})
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="some_user")
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.apple = Post.objects.create(author=cls.user, text='Зелёное яблоко')
+        cls.pear = Post.objects.create(author=cls.user, text='Спелая груша')
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит посты по словам и следит за правками."""
+
+        self.assertEqual(self.search('яблоко'), [self.apple.pk])
+        self.assertEqual(self.search('"груша'), [self.pear.pk])
+        self.assertEqual(self.search(''), [])
+
+        self.pear.text = 'Спелое яблоко'
+        self.pear.save()
+        self.assertEqual(
+            self.search('яблоко'), [self.pear.pk, self.apple.pk]
+        )
+        self.apple.delete()
+        self.assertEqual(self.search('зелёное'), [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс."""
+
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'груша'}
+            )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.pear.pk],
+        )
+        self.assertTrue(any('MATCH' in query['sql'] for query in queries))
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='some_user')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def test_unchanged_pages_answer_304(self):
+        """По If-None-Match неизменная страница отдаётся как 304."""
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with max_queries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_for_guests(self):
+        """Гостям хватает If-Modified-Since."""
+
+        last_modified = self.client.get(self.urls[0])['Last-Modified']
+        response = self.client.get(
+            self.urls[0], HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls[0])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_new_post_changes_etag(self):
+        """Новый пост автора меняет ETag всех его страниц."""
+
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Post.objects.create(
+            author=self.user, group=self.group, text='Ещё пост'
+        )
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag."""
+
+        guest_etag = self.client.get(self.urls[3])['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(
+            self.urls[3], HTTP_IF_NONE_MATCH=guest_etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_relogin_changes_etag(self):
+        """После нового входа страница с формами не отдаётся как 304."""
+
+        User.objects.create_user(username='reader', password='secret-pass')
+        credentials = {'username': 'reader', 'password': 'secret-pass'}
+        login_url = reverse('users:login')
+        client = Client(enforce_csrf_checks=True)
+        client.get(login_url)
+        client.post(login_url, {
+            **credentials,
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        profile = self.urls[2]
+        etag = client.get(profile)['ETag']
+        client.get(reverse('users:logout'))
+        client.get(login_url)
+        client.post(login_url, {
+            **credentials,
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        response = client.get(profile, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        follow = client.post(
+            reverse('posts:profile_follow', args=[self.user.username]),
+            {'csrfmiddlewaretoken': response.context['csrf_token']},
+        )
+        self.assertEqual(follow.status_code, 302)
+
+
+class CachedPostTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='some_user')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Тестовый текст'
+        )
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_post_detail_from_cache(self):
+        """Повторный просмотр поста не ходит в базу."""
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['view_post'], self.post)
+        self.assertEqual(response.context['author_posts_count'], 1)
+
+    def test_edit_invalidates_post(self):
+        """Правка поста сразу видна на его странице."""
+
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Новый текст', 'group': ''},
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['view_post'].text, 'Новый текст')
+        self.assertIsNone(response.context['view_post'].group)
+
+    def test_cached_author_has_no_private_fields(self):
+        """В кеш не попадают пароль, почта и время входа автора."""
+
+        author = self.client.get(self.url).context['view_post'].author
+        self.assertEqual(author.username, 'some_user')
+        self.assertTrue(
+            {'password', 'email', 'last_login'}
+            <= author.get_deferred_fields()
+        )
+
+    def test_delete_invalidates_post(self):
+        """Удалённый пост больше не отдаётся из кеша."""
+
+        self.client.get(self.url)
+        self.post.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_missing_post_cached_without_version(self):
+        """Несуществующий id не заводит версию и не ходит в базу снова."""
+
+        missing = self.post.pk + 1
+        url = reverse('posts:post_detail', args=[missing])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertIsNone(
+            caches[settings.VERSION_CACHE].get(f'post:version:{missing}')
+        )
+        Post.objects.create(pk=missing, author=self.user, text='Новый пост')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_author_and_group_changes_invalidate_post(self):
+        """Счётчик автора и название группы не берутся из старой копии."""
+
+        self.client.get(self.url)
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.group.title = 'Новое название'
+        self.group.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['author_posts_count'], 2)
+        self.assertEqual(
+            response.context['view_post'].group.title, 'Новое название'
+        )
+
+
+class LookupCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='some_user')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=cls.user, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def lookup_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query['sql'] for query in queries
+            if '"posts_group"' in query['sql']
+            or '"auth_user"' in query['sql']
+        ]
+
+    def test_group_and_author_from_cache(self):
+        """Повторный запрос не ищет группу и автора в базе."""
+
+        for url in (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                self.client.get(url)
+                response, queries = self.lookup_queries(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(queries, [])
+
+    def test_missing_slug_cached(self):
+        """Повторный запрос несуществующей страницы не ходит в базу."""
+
+        for url in (
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+
+    def test_missing_slug_leaves_no_version(self):
+        """Ненайденный адрес не заводит в кеше версию своей ленты."""
+
+        for url in (
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+            reverse('posts:group_feed', args=['missing', 'rss']),
+            reverse('posts:profile_feed', args=['missing', 'rss']),
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        versions = caches[settings.VERSION_CACHE]
+        self.assertIsNone(versions.get('feed:version:group:missing'))
+        self.assertIsNone(versions.get('feed:version:profile:missing'))
+
+    def test_created_source_found(self):
+        """Новая группа находится, хотя её slug был закеширован как 404."""
+
+        url = reverse('posts:group_list', args=['new'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        Group.objects.create(title='Новая', slug='new')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_renamed_source_not_found(self):
+        author = User.objects.create_user(username='old_name')
+        url = reverse('posts:profile', args=[author.username])
+        self.client.get(url)
+        author.username = 'new_name'
+        author.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_source_renamed_to_missing_found(self):
+        """Автор находится под новым именем, даже если оно давало 404."""
+
+        author = User.objects.create_user(username='old_name')
+        url = reverse('posts:profile', args=['new_name'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        author.username = 'new_name'
+        author.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_counters_follow_new_posts(self):
+        url = reverse('posts:profile', args=[self.user.username])
+        self.assertEqual(self.client.get(url).context['posts_count'], 1)
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertEqual(self.client.get(url).context['posts_count'], 2)
+
+
+class SyndicationFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='some_user', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_feed(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_feed_formats(self):
+        """Ленты отдаются во всех форматах и содержат пост."""
+
+        urls = {
+            reverse('posts:index_feed', args=['atom']): '<feed',
+            reverse('posts:group_feed', args=[self.group.slug, 'rss']): (
+                '<rss'
+            ),
+            reverse('posts:profile_feed', args=[self.user.username, 'json']): (
+                '"version"'
+            ),
+        }
+        for url, marker in urls.items():
+            with self.subTest(url=url):
+                response, body = self.get_feed(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(marker, body)
+                self.assertIn('Тестовый текст', body)
+        _, body = self.get_feed(
+            reverse('posts:profile_feed', args=[self.user.username, 'json'])
+        )
+        self.assertEqual(
+            json.loads(body)['items'][0]['authors'][0]['name'], 'Лев Толстой'
+        )
+
+    def test_cached_feed_keeps_own_links(self):
+        """Лента из кеша не берёт схему и ссылку на себя у чужого запроса."""
+
+        url = reverse('posts:index_feed', args=['atom'])
+        self.get_feed(f'{url}?x=1')
+        _, body = self.get_feed(url)
+        self.assertIn(f'href="http://testserver{url}"', body)
+        self.assertNotIn('?x=1', body)
+        response = self.client.get(url, secure=True)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'href="https://testserver{url}"', body)
+        self.assertNotIn('http://testserver', body)
+
+    def test_unknown_format_and_group(self):
+        """Неизвестный формат или группа — 404."""
+
+        response = self.client.get(reverse('posts:index_feed', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:group_feed', args=['missing', 'atom'])
+            ).status_code,
+            404,
+        )
+
+    def test_feed_cached_until_write(self):
+        """Лента читается из кеша до следующей записи в неё."""
+
+        url = reverse('posts:group_feed', args=[self.group.slug, 'atom'])
+        self.get_feed(url)
+        with max_queries(0):
+            _, body = self.get_feed(url)
+        self.assertIn('Тестовый текст', body)
+
+        Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост'
+        )
+        _, body = self.get_feed(url)
+        self.assertIn('Свежий пост', body)
+
+    def test_feed_conditional_get(self):
+        """Ленты отвечают 304 на If-None-Match."""
+
+        url = reverse('posts:index_feed', args=['rss'])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class FollowViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def follow_page(self, cursor=None):
+        response = self.client.get(
+            reverse('posts:follow_index'), {'cursor': cursor or ''}
+        )
+        return response.context['page_obj']
+
+    def follow_ids(self):
+        return [row.pk for row in self.follow_page()]
+
+    def test_follow_and_unfollow(self):
+        """Подписка через профиль наполняет ленту, отписка очищает."""
+
+        post = Post.objects.create(author=self.author, text='Пост автора')
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.assertFalse(self.client.get(profile).context['following'])
+
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertTrue(self.client.get(profile).context['following'])
+        self.assertEqual(self.follow_ids(), [post.pk])
+
+        self.client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.follow_ids(), [])
+
+    def test_cannot_follow_self_or_by_get(self):
+        """На себя не подписаться, а GET подписку не создаёт."""
+
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.reader.username])
+        )
+        response = self.client.get(
+            reverse('posts:group_follow', args=[self.group.slug])
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Subscription.objects.exists())
+
+    @override_settings(PAGINATOR_POST_COUNT=3, TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_merges_pulled_sources(self):
+        """Лента сливает разложенные посты и посты популярной группы."""
+
+        fan = User.objects.create_user(username='fan')
+        Subscription.objects.create(user=fan, group=self.group)
+        self.client.post(reverse('posts:group_follow', args=[self.group.slug]))
+        self.client.post(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        posts = [
+            Post.objects.create(
+                author=self.author if i % 2 else fan,
+                group=None if i % 2 else self.group,
+                text=f'Пост {i}',
+            )
+            for i in range(7)
+        ]
+        expected = [post.pk for post in reversed(posts)]
+
+        seen, cursor = [], None
+        while True:
+            with max_queries(6):
+                page = self.follow_page(cursor)
+            seen += [row.pk for row in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
@@ -0,0 +1,156 @@
+"""Лента подписок: авторы и группы, на которые подписан пользователь.
+
+Посты раскладываются по лентам подписчиков при записи (TimelineEntry),
+и страница ленты читается по индексу одной таблицы. Исключение —
+источники, у которых больше TIMELINE_FANOUT_LIMIT подписчиков: их
+посты не раскладываются, а подмешиваются при чтении.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, Group, Post, Subscription, TimelineEntry
+from .utils import CursorPaginator, after_key
+
+
+def source_filter(author_id=None, group_id=None, prefix=''):
+    """Q по автору и группе; пустой Q, если не задано ни то, ни другое."""
+
+    condition = Q()
+    if author_id is not None:
+        condition |= Q(**{f'{prefix}author_id': author_id})
+    if group_id is not None:
+        condition |= Q(**{f'{prefix}group_id': group_id})
+    return condition
+
+
+def is_pulled(author_id=None, group_id=None):
+    """У источника так много подписчиков, что посты берутся при чтении."""
+
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if author_id is not None:
+        return AuthorStats.objects.filter(
+            author_id=author_id, followers_count__gt=limit
+        ).exists()
+    return Group.objects.filter(
+        pk=group_id, followers_count__gt=limit
+    ).exists()
+
+
+def add_entries(user_ids, posts):
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in user_ids
+            for pk, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post, created=True):
+    """Раскладывает пост по лентам подписчиков его автора и группы.
+
+    Для изменённого поста сначала убирает его из лент тех, кто больше
+    не должен его видеть, например после переноса в другую группу.
+    """
+
+    if not created:
+        TimelineEntry.objects.filter(post=post).exclude(
+            user_id__in=Subscription.objects.filter(
+                source_filter(post.author_id, post.group_id)
+            ).values('user_id')
+        ).delete()
+
+    author_id = None if is_pulled(author_id=post.author_id) else post.author_id
+    group_id = post.group_id
+    if group_id is not None and is_pulled(group_id=group_id):
+        group_id = None
+    sources = source_filter(author_id, group_id)
+    if not sources:
+        return
+    user_ids = Subscription.objects.filter(sources).values_list(
+        'user_id', flat=True
+    ).distinct()
+    add_entries(user_ids, [(post.pk, post.pub_date)])
+
+
+def backfill(user_ids, author_id=None, group_id=None):
+    """Кладёт в ленты последние посты источника."""
+
+    posts = Post.objects.filter(
+        source_filter(author_id, group_id)
+    ).order_by('-pub_date', '-id').values_list('pk', 'pub_date')
+    add_entries(user_ids, list(posts[:settings.TIMELINE_BACKFILL]))
+
+
+def prune(user_id, author_id=None, group_id=None):
+    """Убирает из ленты посты источника, не покрытые другими подписками."""
+
+    subscriptions = Subscription.objects.filter(user_id=user_id)
+    TimelineEntry.objects.filter(user_id=user_id).filter(
+        source_filter(author_id, group_id, prefix='post__')
+    ).exclude(
+        Q(post__author_id__in=subscriptions.filter(
+            author__isnull=False
+        ).values('author_id'))
+        | Q(post__group_id__in=subscriptions.filter(
+            group__isnull=False
+        ).values('group_id'))
+    ).delete()
+
+
+def rebuild_timeline(user_id):
+    """Собирает ленту пользователя заново по его подпискам."""
+
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    for author_id, group_id in Subscription.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', 'group_id'):
+        if not is_pulled(author_id, group_id):
+            backfill([user_id], author_id, group_id)
+
+
+def pulled_sources(user):
+    """Q по постам источников пользователя, не разложенных по лентам."""
+
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    pulled = Subscription.objects.filter(user=user).filter(
+        Q(author__stats__followers_count__gt=limit)
+        | Q(group__followers_count__gt=limit)
+    ).values_list('author_id', 'group_id')
+    condition = Q()
+    for author_id, group_id in pulled:
+        condition |= source_filter(author_id, group_id)
+    return condition
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная пагинация ленты подписок пользователя.
+
+    Ключи постов берутся из TimelineEntry, посты источников с большим
+    числом подписчиков — из таблицы постов, и обе выборки сливаются.
+    """
+
+    def __init__(self, user, per_page, **kwargs):
+        super().__init__(Post.objects.rows(), per_page, **kwargs)
+        self.user = user
+
+    def _fetch(self, key, backwards):
+        limit = self.per_page + 1
+        entries = after_key(
+            TimelineEntry.objects.filter(user=self.user),
+            key, backwards, pk_field='post_id',
+        )
+        post_ids = list(entries.values_list('post_id', flat=True)[:limit])
+        posts = list(self.object_list.filter(pk__in=post_ids))
+        pulled = pulled_sources(self.user)
+        if pulled:
+            posts += after_key(
+                self.object_list.filter(pulled), key, backwards
+            )[:limit]
+        unique = {post.pk: post for post in posts}.values()
+        return sorted(
+            unique,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not backwards,
+        )[:limit]
@@ -0,0 +1,92 @@
+import csv
+import json
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('text', 'pub_date', 'author', 'group')
+
+
+def guess_format(path, default='jsonl'):
+    """Формат по расширению файла: .csv или JSON Lines."""
+
+    return 'csv' if path.lower().endswith('.csv') else default
+
+
+class BadRow(ValueError):
+    """Запись, которую нельзя загрузить; сообщение несёт номер строки."""
+
+    def __init__(self, number, reason):
+        super().__init__(f'Строка {number}: {reason}')
+
+
+def decode_lines(stream):
+    """Строки байтового потока, декодированные из UTF-8, с номерами."""
+
+    for number, line in enumerate(stream, start=1):
+        try:
+            yield number, line.decode('utf-8')
+        except UnicodeDecodeError:
+            raise BadRow(number, 'текст не в кодировке UTF-8.')
+
+
+def read_csv(stream):
+    reader = csv.DictReader(line for _, line in decode_lines(stream))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            raise BadRow(reader.line_num, f'не CSV ({error}).')
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for number, line in decode_lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise BadRow(number, f'не JSON ({error}).')
+        if not isinstance(row, dict):
+            raise BadRow(number, 'ожидался JSON-объект.')
+        yield number, row
+
+
+def read_rows(stream, fmt):
+    """Лениво читает записи постов из байтового потока, строка за строкой.
+
+    Отдаёт пары (номер строки в файле, запись). Строки декодируются по
+    одной, поэтому и ошибка кодировки называет номер своей строки.
+    """
+
+    return read_csv(stream) if fmt == 'csv' else read_jsonl(stream)
+
+
+def write_rows(stream, fmt, rows):
+    """Пишет записи постов в поток по мере их получения.
+
+    Вернёт число записанных строк.
+    """
+
+    written = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        return written
+    for text, pub_date, author, group in rows:
+        # isoformat, а не DjangoJSONEncoder: тот режет микросекунды,
+        # и порядок постов с близкими датами терялся бы.
+        record = {
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+            'group': group,
+        }
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        written += 1
+    return written
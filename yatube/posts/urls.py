@@ -6,9 +6,42 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('feeds/<str:fmt>/', views.index_feed, name='index_feed'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/feeds/<str:fmt>/',
+        views.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'group/<slug:slug>/follow/',
+        views.group_follow,
+        name='group_follow'
+    ),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow'
+    ),
+    path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/feeds/<str:fmt>/',
+        views.profile_feed,
+        name='profile_feed'
+    ),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
 ]
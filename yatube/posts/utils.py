@@ -1,8 +1,203 @@
+import base64
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+POSTS_TOTAL_CACHE_KEY = 'posts:total'
+
+
+def encode_cursor(direction, pub_date, pk):
+    """Упаковывает позицию в ленте в непрозрачный токен для ?cursor=."""
+
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, для испорченного токена вернёт None."""
+
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, совместимая с Page, но без номера и COUNT(*)."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(CURSOR_NEXT, last.pub_date, last.pk)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(CURSOR_PREVIOUS, first.pub_date, first.pk)
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id).
+
+    Любая страница выбирается по индексу за одно и то же время:
+    вместо COUNT(*) и OFFSET запрашивается per_page + 1 запись
+    после позиции из курсора.
+    """
+
+    def get_cursor_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._build_page(None, backwards=False)
+        direction, pub_date, pk = cursor
+        page = self._build_page(
+            (pub_date, pk), backwards=direction == CURSOR_PREVIOUS
+        )
+        if not page.object_list:
+            return self._build_page(None, backwards=False)
+        return page
+
+    def _build_page(self, key, backwards):
+        items = self._fetch(key, backwards)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+            return CursorPage(items, self, True, has_more)
+        return CursorPage(items, self, has_more, key is not None)
+
+    def _fetch(self, key, backwards):
+        """Вернёт до per_page + 1 записей после ключа key."""
+
+        queryset = after_key(self.object_list, key, backwards)
+        return list(queryset[:self.per_page + 1])
+
+
+def after_key(queryset, key, backwards, pk_field='id'):
+    """Записи queryset после ключа (pub_date, pk) в порядке обхода ленты."""
+
+    if key is not None:
+        pub_date, pk = key
+        lookup = 'gt' if backwards else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(pub_date=pub_date, **{f'{pk_field}__{lookup}': pk})
+        )
+    if backwards:
+        return queryset.order_by('pub_date', pk_field)
+    return queryset.order_by('-pub_date', f'-{pk_field}')
+
+
+class WindowPage(Page):
+    @cached_property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class WindowPaginator(Paginator):
+    """Пагинатор, который выводит окно номеров вокруг текущей страницы.
+
+    Вместо всех num_pages ссылок — первые и последние PAGINATOR_ON_ENDS
+    номеров и по PAGINATOR_ON_EACH_SIDE с каждой стороны от текущего,
+    пропуски заменяются на ELLIPSIS. Размер разметки не зависит от
+    числа постов.
+    """
+
+    ELLIPSIS = '…'
+
+    def _get_page(self, *args, **kwargs):
+        return WindowPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=None):
+        if on_each_side is None:
+            on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+        if on_ends is None:
+            on_ends = settings.PAGINATOR_ON_ENDS
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+class CachedCountPaginator(WindowPaginator):
+    """Пагинатор, который берёт общее число записей из кеша.
+
+    COUNT(*) выполняется только при промахе; значение живёт
+    PAGINATOR_COUNT_CACHE_TIMEOUT секунд и сбрасывается при записи
+    постов, так что page_range и num_pages остаются верными.
+    """
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return cache.get_or_set(
+            self.count_key,
+            self.object_list.count,
+            settings.PAGINATOR_COUNT_CACHE_TIMEOUT,
+        )
 
 
-def paginator_posts(request, queryset):
-    paginator = Paginator(queryset, settings.PAGINATOR_POST_COUNT)
+def paginator_posts(request, queryset, cursor_mode=None, count_key=None):
+    if cursor_mode is None:
+        cursor_mode = settings.PAGINATOR_CURSOR_MODE
+    if cursor_mode:
+        paginator = CursorPaginator(queryset, settings.PAGINATOR_POST_COUNT)
+        return paginator.get_cursor_page(request.GET.get('cursor'))
+    if count_key is not None:
+        paginator = CachedCountPaginator(
+            queryset, settings.PAGINATOR_POST_COUNT, count_key
+        )
+    else:
+        paginator = WindowPaginator(queryset, settings.PAGINATOR_POST_COUNT)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
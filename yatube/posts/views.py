@@ -1,18 +1,43 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from core.routers import replica_reads
 
-from .models import Post, Group, User
+from .cache import FEED_GROUP, FEED_INDEX, FEED_PROFILE
+from .conditional import (
+    feed_condition,
+    group_versions,
+    index_versions,
+    post_versions,
+    profile_versions,
+)
+from .counters import author_posts_count
+from .models import EditConflict, Post, Subscription
+from .lookups import get_author_or_404, get_group_or_404
+from .objects import get_post_or_404
 from .forms import PostForm
-from .utils import paginator_posts
+from .search import search_posts
+from .syndication import feed_response
+from .timeline import TimelinePaginator
+from .utils import POSTS_TOTAL_CACHE_KEY, paginator_posts
 
 
+@replica_reads
+@feed_condition(index_versions)
 def index(request):
     """Главная страница."""
 
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
-    posts = Post.objects.all()
-    page_obj = paginator_posts(request, posts)
+    posts = Post.objects.rows()
+    page_obj = paginator_posts(
+        request, posts, count_key=POSTS_TOTAL_CACHE_KEY
+    )
 
     context = {
         'title': title,
@@ -21,22 +46,42 @@ def index(request):
     return render(request, template, context)
 
 
+@replica_reads
+@feed_condition(group_versions)
 def group_posts(request, slug):
     """Посты, отфильтрованные по группам."""
 
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    group = get_group_or_404(slug)
+    posts = group.group_posts.rows()
     page_obj = paginator_posts(request, posts)
 
     context = {
         'title': f'Записи сообщества {group.title}',
         'group': group,
+        'following': is_following(request.user, group=group),
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@replica_reads
+def search(request):
+    """Поиск по текстам постов."""
+
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(Post.objects.rows(), query)
+    page_obj = paginator_posts(request, posts)
+
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """Публикация нового поста."""
@@ -61,47 +106,72 @@ def post_create(request):
 def post_edit(request, post_id):
     """Редактирование поста."""
 
-    post = get_object_or_404(Post, pk=post_id)
-    template = 'posts/create_post.html'
-    form = PostForm(request.POST or None, instance=post)
+    post = get_post_or_404(post_id)
+    if request.user.pk != post.author_id:
+        return redirect('posts:post_detail', post_id=post.id)
 
-    if request.method == 'GET':
-        if request.user.pk != post.author.pk:
+    form = PostForm(request.POST or None, instance=post)
+    version = post.version
+    if form.is_valid():
+        if not form.has_changed():
             return redirect('posts:post_detail', post_id=post.id)
-        context = {
-            'title': 'Редактировать запись',
-            'form': form,
-            'is_edit': True,
-            'post': post,
-        }
-        return render(request, template, context)
-
-    if request.method == 'POST':
-        if form.is_valid() and request.user.pk == post.author.pk:
-            form.save()
+        try:
+            post.save_changes(
+                form.changed_data, posted_version(request, post.version)
+            )
+        except EditConflict:
+            form.add_error(None, (
+                'Пост изменили, пока вы его правили. Проверьте текст '
+                'и сохраните ещё раз.'
+            ))
+            # Повторная отправка формы перезапишет чужую правку.
+            version = Post.objects.values_list(
+                'version', flat=True
+            ).get(pk=post.pk)
+        else:
             return redirect('posts:post_detail', post_id=post.id)
 
-        elif request.user.pk != post.author.pk:
-            return redirect('posts:post_detail', post_id=post.id)
+    context = {
+        'title': 'Редактировать запись',
+        'form': form,
+        'is_edit': True,
+        'post': post,
+        'version': version,
+    }
+    return render(request, 'posts/create_post.html', context)
 
 
+def posted_version(request, default):
+    """Версия поста, открытого для правки, из скрытого поля формы."""
+
+    try:
+        return int(request.POST['version'])
+    except (KeyError, ValueError):
+        return default
+
+
+@replica_reads
+@feed_condition(post_versions)
 def post_detail(request, post_id):
     """Просмотр поста."""
 
-    view_post = get_object_or_404(Post, pk=post_id)
+    view_post = get_post_or_404(post_id)
 
     context = {
-        'title': view_post.text[:30],
+        'title': view_post.excerpt[:30],
         'view_post': view_post,
+        'author_posts_count': author_posts_count(view_post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@feed_condition(profile_versions)
 def profile(request, username):
     """Профайл пользователя."""
 
-    author_name = get_object_or_404(User, username=username)
-    posts_list = author_name.posts.all()
+    author_name = get_author_or_404(username)
+    posts_list = author_name.posts.rows()
     page_obj = paginator_posts(request, posts_list)
 
     context = {
@@ -110,6 +180,119 @@ def profile(request, username):
                      {author_name.last_name}
             """,
         'author_name': author_name,
+        'posts_count': author_posts_count(author_name),
+        'following': is_following(request.user, author=author_name),
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
+
+
+@replica_reads
+@feed_condition(index_versions)
+def index_feed(request, fmt):
+    """Лента главной для агрегаторов."""
+
+    def load():
+        return (
+            'Последние обновления на сайте',
+            reverse('posts:index'),
+            'Новые записи всех авторов Yatube',
+            Post.objects.feed(),
+        )
+    return feed_response(request, fmt, FEED_INDEX, '', load)
+
+
+@replica_reads
+@feed_condition(group_versions)
+def group_feed(request, slug, fmt):
+    """Лента группы для агрегаторов."""
+
+    group = get_group_or_404(slug)
+
+    def load():
+        return (
+            f'Записи сообщества {group.title}',
+            reverse('posts:group_list', args=[slug]),
+            group.description,
+            group.group_posts.feed(),
+        )
+    return feed_response(request, fmt, FEED_GROUP, slug, load)
+
+
+@replica_reads
+@feed_condition(profile_versions)
+def profile_feed(request, username, fmt):
+    """Лента автора для агрегаторов."""
+
+    author = get_author_or_404(username)
+
+    def load():
+        return (
+            f'Записи пользователя {author.get_full_name() or username}',
+            reverse('posts:profile', args=[username]),
+            f'Новые записи {username} на Yatube',
+            author.posts.feed(),
+        )
+    return feed_response(request, fmt, FEED_PROFILE, username, load)
+
+
+def is_following(user, **source):
+    if not user.is_authenticated:
+        return False
+    return Subscription.objects.filter(user=user, **source).exists()
+
+
+@replica_reads
+@login_required
+def follow_index(request):
+    """Лента подписок пользователя."""
+
+    paginator = TimelinePaginator(request.user, settings.PAGINATOR_POST_COUNT)
+    page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+
+    context = {
+        'title': 'Лента подписок',
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    """Подписка на автора."""
+
+    author = get_author_or_404(username)
+    if author != request.user:
+        Subscription.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    """Отписка от автора."""
+
+    author = get_author_or_404(username)
+    Subscription.objects.filter(user=request.user, author=author).delete()
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def group_follow(request, slug):
+    """Подписка на группу."""
+
+    group = get_group_or_404(slug)
+    Subscription.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def group_unfollow(request, slug):
+    """Отписка от группы."""
+
+    group = get_group_or_404(slug)
+    Subscription.objects.filter(user=request.user, group=group).delete()
+    return redirect('posts:group_list', slug)
@@ -2,6 +2,8 @@
 ASGI config for yatube project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler of its own, so views run in the thread pool
+of core.asgi.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -9,7 +11,7 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
@@ -23,7 +23,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'bal3-e3qox)uug!s^4x0$_kqp92w=nfy1*pq@klt)34b=+ztsp'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = []
 
@@ -44,11 +44,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,18 +58,29 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+# Без DEBUG шаблоны компилируются один раз на процесс: их держит
+# cached.Loader, а при старте прогревает core.template_backend.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+CACHED_TEMPLATE_LOADERS = [
+    ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else CACHED_TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year',
+                'core.context_processors.site.site_globals',
             ],
         },
     },
@@ -75,17 +88,99 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Сколько view одновременно выполняет ASGI-вход (yatube.asgi)
+ASGI_THREADS = 10
+# Сколько кусков ответа ждут отправки медленному клиенту, прежде чем
+# поток view остановится
+ASGI_SEND_QUEUE = 8
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Подключение к базе берётся из окружения, по умолчанию — SQLite рядом
+# с проектом. Соединения живут DB_CONN_MAX_AGE секунд; простоявшие
+# дольше DATABASE_HEALTH_CHECK_IDLE секунд проверяются перед запросом
+# (core.db).
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.environ.get('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Через сколько секунд простоя соединение проверяется перед запросом
+DATABASE_HEALTH_CHECK_IDLE = int(
+    os.environ.get('DB_HEALTH_CHECK_IDLE', 10)
+)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Псевдонимы реплик из DATABASES, с которых читают ленты и посты,
+# и приложения, чьи модели можно с них читать. Реплики задаются
+# через DB_REPLICA_HOSTS (серверные базы) или DB_REPLICA_NAMES (файлы
+# SQLite), через запятую; в тестах они смотрят в тестовую default.
+DATABASE_REPLICAS = []
+for number, (key, value) in enumerate(
+    [('HOST', host) for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+    + [('NAME', name) for name in os.environ.get('DB_REPLICA_NAMES', '').split(',') if name],
+    start=1,
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], **{key: value}, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+DATABASE_REPLICA_APPS = ['posts', 'auth']
+
+# Сколько секунд после записи сессия читает только с основной базы
+DATABASE_REPLICA_STICKY = 10
+# Насколько реплика может отставать: данные, изменённые позже, читаются
+# с основной базы, прежде чем лечь в кеш под новой версией
+DATABASE_REPLICA_LAG = 10
+
+# PRAGMA для каждого нового соединения с SQLite: WAL, чтобы читатели
+# не ждали писателя, и ожидание блокировки вместо ошибки
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+
+
+# Кеш в два уровня (core.cache.TieredCache): LRU в памяти процесса
+# перед общим для процессов кешем 'shared'. Общий кеш задаётся через
+# CACHE_BACKEND и CACHE_LOCATION, например memcached; по умолчанию это
+# LocMem, и L2 живёт в том же процессе.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'yatube',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': int(
+                os.environ.get('CACHE_L1_MAX_ENTRIES', 1000)
+            ),
+            'L1_TIMEOUT': float(os.environ.get('CACHE_L1_TIMEOUT', 5)),
+        },
+    },
+    'shared': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yatube-shared'),
+    },
+}
+
+# Версии лент и постов (posts.cache) хранятся прямо в L2: сброс кеша
+# в одном процессе сразу виден остальным.
+VERSION_CACHE = 'shared'
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -138,3 +233,39 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATOR_POST_COUNT = 10
+
+# Сколько номеров страниц выводится у краёв и с каждой стороны от
+# текущей; остальные сворачиваются в «…»
+PAGINATOR_ON_ENDS = 2
+PAGINATOR_ON_EACH_SIDE = 3
+
+# Пагинация по курсору (pub_date, id) вместо номеров страниц
+PAGINATOR_CURSOR_MODE = False
+
+# Сколько секунд пагинатор главной доверяет закешированному COUNT(*)
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+# Сколько секунд живёт отрисованная страница ленты
+FEED_CACHE_TIMEOUT = 300
+
+# Сколько секунд живут копия поста в кеше и отметка о том, что поста
+# с таким id нет (posts.objects)
+POST_CACHE_TIMEOUT = 300
+POST_MISS_TIMEOUT = 60
+
+# Сколько секунд живут найденные и ненайденные группы и авторы
+# (posts.lookups)
+LOOKUP_CACHE_TIMEOUT = 300
+LOOKUP_MISS_TIMEOUT = 60
+
+# Лента подписок: посты авторов и групп, у которых подписчиков больше
+# TIMELINE_FANOUT_LIMIT, не раскладываются по лентам, а берутся при
+# чтении; при подписке в ленту кладётся TIMELINE_BACKFILL последних постов
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 100
+
+# Сколько последних записей попадает в Atom/RSS/JSON-ленты
+SYNDICATION_ITEMS = 50
+
+# Сколько самых медленных запросов процесса держать для /debug/slow-requests/
+REQUEST_TIMING_SLOW_LOG_SIZE = 50
@@ -20,6 +20,7 @@ urlpatterns = [
     path('', include('posts.urls', namespace='post')),
     path('about/', include('about.urls', namespace='about')),
     path('admin/', admin.site.urls),
+    path('debug/', include('core.urls', namespace='core')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls'))
 ]